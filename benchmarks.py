@@ -0,0 +1,594 @@
+import os
+import time
+import json
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import io
+import random
+import warnings
+from pathlib import Path
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+import numpy as np
+import pandas as pd
+from sql_processor import (common_keys, FULL_GRID_PHASES, PLAYER_ORDER_QUERY, aggregate_team_stats,
+                           aggregate_team_stats_by_phase, derive_player_features, merged_csv_files, read_season_csvs)
+from trade_graph_builder import HTML_BACKENDS, iter_trade_texts, TradeGraph
+from trade_store import load_trade_rows
+from feature_store import FEATURE_CSVS, feature_columns, read_features
+from sklearn.inspection import permutation_importance
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from importance import feature_groups, grouped_permutation_importance
+from regression import AGGREGATE_SUFFIXES, datasets, load_dataset
+from master_csv_creator import CTG_CSV_DIR, SEASONS, merge_season, combine_csv_files_loop
+from player_query import PlayerQuery
+from stats_backend import get_backend
+from ctg_data import CTG_YEARS, season_label
+from model_search import SEARCH_PARAMS
+from pipeline import Stage, with_dependencies
+from instrumentation import REGRESSION_THRESHOLD, compare_reports, observe, write_report
+from synthetic_data import LABEL_FILES, SYNTHETIC_SEED, generate_workspace
+
+BASELINE_DIR = "benchmark_baselines"
+# a coarser grid than regression.py searches, so the regression stage takes minutes rather than an hour
+BENCH_SEARCH_PARAMS = dict(SEARCH_PARAMS, l1_ratios=[0.1, 0.5, 0.9], Cs=np.logspace(-2, 2, 4).tolist(), inner_cv=3)
+# every stage is timed this many times, each on a fresh workspace, and the median is compared
+STAGE_REPEATS = 3
+# stages whose baseline and new median are both under this many seconds never fail the run
+STAGE_FLOOR_SECONDS = 1.0
+
+
+def time_call(fn, *args, repeats=1):
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def aggregate_team_stats_loop(df, rank_cols):
+    """Original per team-season loop, kept as the reference for benchmark_team_aggregation"""
+    teams = df['team'].unique()
+    seasons = df['season'].unique()
+    
+    team_stats = []
+
+    for team in teams:
+        for season in seasons:
+            team_season_df = df[(df['team'] == team) & (df['season'] == season)]
+            team_row = {
+                'Team': team,
+                'Season': season,
+            }
+            
+            total_team_minutes = team_season_df['min'].sum()
+            
+            for rank_col in rank_cols:
+                rank_values = team_season_df[rank_col]
+
+                max_value = rank_values.max()
+                team_row[f'{rank_col}_highest'] = max_value
+                
+                top2_values = rank_values.nlargest(2)
+                avg_top2 = round(top2_values.mean(), 2)
+                team_row[f'{rank_col}_top2_avg'] = avg_top2
+                
+                players_with_rank = team_season_df[team_season_df[rank_col].notna()]
+                
+                weighted_sum = 0
+                for _, player in players_with_rank.iterrows():
+                    player_rank = player[rank_col]
+                    player_minutes = player['min']
+                    weight = player_minutes / total_team_minutes
+                    weighted_sum += player_rank * weight
+                    
+                team_row[f'{rank_col}_weighted'] = round(weighted_sum, 2)
+
+            team_stats.append(team_row)
+    
+    return pd.DataFrame(team_stats)
+
+
+def benchmark_team_aggregation(player_csv='all_player_season_stats.csv', phase='Regular_Season', repeats=3):
+    df = pd.read_csv(player_csv)
+    # the loop predates phases, so compare one phase at a time
+    df = df[df['phase'] == phase].reset_index(drop=True)
+    rank_cols = [col for col in df.columns if col not in common_keys]
+    print(f"Team aggregation: {len(df)} player-seasons, {len(rank_cols)} stat columns")
+
+    loop_time, loop_df = time_call(aggregate_team_stats_loop, df, rank_cols)
+    grouped_time, grouped_df = time_call(aggregate_team_stats, df, rank_cols, repeats=repeats)
+
+    identical = loop_df.to_csv(index=False) == grouped_df.to_csv(index=False)
+    print(f"  loop:    {loop_time:8.3f}s")
+    print(f"  grouped: {grouped_time:8.3f}s ({loop_time / grouped_time:.0f}x faster)")
+    print(f"  identical CSV output: {identical}")
+    return {'loop': loop_time, 'grouped': grouped_time, 'identical': identical}
+
+
+def benchmark_trade_extraction(years=range(2004, 2025), repeats=5):
+    html_files = [f"bbref_htmls/{year}.html" for year in years]
+    print(f"Trade paragraph extraction over {len(html_files)} bbref pages")
+
+    def extract_all(backend):
+        return [list(iter_trade_texts(html_file, backend)) for html_file in html_files]
+
+    timings = {}
+    baseline = None
+    for backend in HTML_BACKENDS:
+        try:
+            elapsed, paragraphs = time_call(extract_all, backend, repeats=repeats)
+        except ImportError as e:
+            print(f"  {backend:5s}: unavailable ({e})")
+            continue
+        if baseline is None:
+            baseline = (elapsed, paragraphs)
+        timings[backend] = elapsed
+        same = paragraphs == baseline[1]
+        print(f"  {backend:5s}: {elapsed:8.3f}s ({baseline[0] / elapsed:.1f}x vs soup), "
+              f"{sum(map(len, paragraphs))} trades, identical: {same}")
+    return timings
+
+
+def scan_trade_partners(trades_by_season, team, season):
+    partners = Counter()
+    for trade in trades_by_season.get(str(season), []):
+        teams = [t["team"] for t in trade["teams"]]
+        if team in teams:
+            partners.update(t for t in teams if t != team)
+    return partners
+
+
+def scan_pick_chain(trades_by_season, year, round, team):
+    hops = []
+    for season in sorted(trades_by_season, key=int):
+        for trade in trades_by_season[season]:
+            for side in trade["teams"]:
+                for asset in side["sent"]:
+                    if (asset["type"] == "pick" and str(asset.get("year")) == str(year)
+                            and asset.get("round") == round and asset.get("team") == team):
+                        hops.append((season, side["team"]))
+    return hops
+
+
+def benchmark_trade_graph(trades_json="trades.json", n_queries=2000, seed=42):
+    with open(trades_json) as f:
+        trades_by_season = json.load(f)
+    build_time, graph = time_call(TradeGraph.from_trades, trades_by_season)
+    print(f"Trade graph: {len(graph.trades)} trades, {len(graph.edges)} edges, built in {build_time * 1000:.1f}ms")
+
+    rng = random.Random(seed)
+    team_seasons = list(graph.by_team_season)
+    picks = list(graph.by_pick)
+    partner_queries = [rng.choice(team_seasons) for _ in range(n_queries)]
+    pick_queries = [rng.choice(picks) for _ in range(n_queries)]
+
+    results = {}
+    for name, graph_fn, scan_fn, queries in [
+        ("trade partners", lambda q: graph.trade_partners(*q), lambda q: scan_trade_partners(trades_by_season, *q), partner_queries),
+        ("pick chain", lambda q: graph.pick_chain(*q), lambda q: scan_pick_chain(trades_by_season, *q), pick_queries),
+    ]:
+        graph_time, _ = time_call(lambda: [graph_fn(q) for q in queries])
+        scan_time, _ = time_call(lambda: [scan_fn(q) for q in queries])
+        results[name] = {'graph': graph_time / n_queries, 'scan': scan_time / n_queries}
+        print(f"  {name:15s}: graph {graph_time / n_queries * 1e6:8.1f}us/query, "
+              f"scan {scan_time / n_queries * 1e6:8.1f}us/query ({scan_time / graph_time:.0f}x)")
+    return results
+
+
+def benchmark_trade_store(trades_json="trades.json", store_path="trades.arrow", repeats=20):
+    def load_json():
+        with open(trades_json) as f:
+            return json.load(f)
+
+    json_time, _ = time_call(load_json, repeats=repeats)
+    store_time, table = time_call(load_trade_rows, store_path, repeats=repeats)
+    season_time, _ = time_call(lambda: load_trade_rows(store_path, seasons=[2015], teams=["BOS"]), repeats=repeats)
+    print(f"Trade storage: {table.num_rows} transfer rows")
+    print(f"  json.load {trades_json}:       {json_time * 1000:8.2f}ms")
+    print(f"  mmap {store_path} (all):       {store_time * 1000:8.2f}ms")
+    print(f"  mmap {store_path} (2015, BOS): {season_time * 1000:8.2f}ms")
+    return {'json': json_time, 'store': store_time, 'season_team': season_time}
+
+
+def benchmark_feature_store(repeats=5):
+    print("Feature loads: CSV vs memory-mapped store (all columns / 3 columns)")
+    results = {}
+    for name, csv_file in FEATURE_CSVS.items():
+        columns = feature_columns(name)[:3]
+        csv_time, _ = time_call(pd.read_csv, csv_file, repeats=repeats)
+        store_time, df = time_call(read_features, name, repeats=repeats)
+        projected_time, _ = time_call(lambda: read_features(name, columns=columns), repeats=repeats)
+        results[name] = {'csv': csv_time, 'store': store_time, 'projected': projected_time}
+        print(f"  {name:26s} {df.shape[1]:4d} cols: csv {csv_time * 1000:7.1f}ms, "
+              f"store {store_time * 1000:6.1f}ms, projected {projected_time * 1000:6.1f}ms")
+    return results
+
+
+def benchmark_permutation_importance(label_name="playoffs", n_repeats=10):
+    X, y, _ = load_dataset(*datasets[label_name])
+    X_values, y_values = X.to_numpy(), y.to_numpy()
+    # roughly the model regression.py selects, without running the search
+    pipeline = Pipeline([
+        ('scaler', StandardScaler()),
+        ('clf', LogisticRegression(penalty='elasticnet', solver='saga', C=0.03, l1_ratio=0.5,
+                                   max_iter=20000, random_state=42)),
+    ]).fit(X_values, y_values)
+    groups = feature_groups(X.columns, AGGREGATE_SUFFIXES)
+    print(f"Permutation importance ({label_name}): {X.shape[1]} columns in {len(groups)} stat groups, "
+          f"{n_repeats} repeats")
+
+    sklearn_time, result = time_call(lambda: permutation_importance(
+        pipeline, X_values, y_values, n_repeats=n_repeats, random_state=42, n_jobs=-1, scoring='roc_auc'))
+    grouped_time, grouped = time_call(grouped_permutation_importance, pipeline, X_values, y_values, groups)
+
+    repeats = sum(r[2] for r in grouped.values())
+    # sklearn's per-column drops summed per group, for a sanity check on the ordering
+    column_sums = pd.Series({stat: result.importances_mean[cols].sum() for stat, cols in groups.items()})
+    grouped_means = pd.Series({stat: r[0] for stat, r in grouped.items()})
+    rank_corr = column_sums.corr(grouped_means, method='spearman')
+    print(f"  sklearn: {sklearn_time:8.3f}s ({X.shape[1] * n_repeats} permutations)")
+    print(f"  grouped: {grouped_time:8.3f}s ({repeats} permutations, {sklearn_time / grouped_time:.0f}x faster)")
+    print(f"  spearman vs summed sklearn importances: {rank_corr:.3f}")
+    return {'sklearn': sklearn_time, 'grouped': grouped_time, 'rank_corr': rank_corr}
+
+
+def benchmark_csv_merge(seasons=SEASONS, processes=None):
+    season_dirs = [CTG_CSV_DIR / season for season in seasons if (CTG_CSV_DIR / season).exists()]
+    print(f"CTG category merge over {len(season_dirs)} regular-season directories")
+
+    with warnings.catch_warnings():
+        # the old loop fragments the frame on every concat
+        warnings.simplefilter("ignore")
+        loop_time, loop_frames = time_call(lambda: [combine_csv_files_loop(d) for d in season_dirs])
+    schema_time, schema_frames = time_call(lambda: [merge_season(d) for d in season_dirs])
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        parallel_time, _ = time_call(lambda: list(pool.map(merge_season, season_dirs)))
+
+    same_columns = all(list(a.columns) == list(b.columns) for a, b in zip(loop_frames, schema_frames))
+    # the old loop pairs rows by position, so on/off ranks land on the wrong players
+    moved = sum(int((~((a == b) | (a.isna() & b.isna()))).sum().sum()) for a, b in zip(loop_frames, schema_frames))
+    print(f"  loop:            {loop_time:8.3f}s")
+    print(f"  schema join:     {schema_time:8.3f}s ({loop_time / schema_time:.1f}x faster)")
+    print(f"  schema parallel: {parallel_time:8.3f}s ({loop_time / parallel_time:.1f}x faster)")
+    print(f"  same columns: {same_columns}, cells that differ (realigned rows): {moved}")
+    return {'loop': loop_time, 'schema': schema_time, 'parallel': parallel_time, 'same_columns': same_columns}
+
+
+def benchmark_player_query(player_csv='all_player_season_stats.csv', team='BOS', season='2023-24', phase='Regular_Season', repeats=20):
+    df = pd.read_csv(player_csv)
+    rank_cols = [col for col in df.columns if col not in common_keys]
+    print(f"Player query pushdown: {team} {season} {phase} out of {len(df)} player-seasons")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'nba_stats.db')
+        with sqlite3.connect(db_path) as conn:
+            df.to_sql('player_season_stats', conn, index=False)
+            conn.execute("CREATE INDEX idx_season_team ON player_season_stats (season, team)")
+
+        def full_scan():
+            with sqlite3.connect(db_path) as conn:
+                players = pd.read_sql_query("SELECT * FROM player_season_stats", conn)
+            return players[(players['team'] == team) & (players['season'] == season) & (players['phase'] == phase)]
+
+        query = PlayerQuery(db_path).where(team=team, season=season, phase=phase)
+        scan_time, scanned = time_call(full_scan, repeats=3)
+        fetch_time, fetched = time_call(query.fetch, repeats=repeats)
+        select_time, _ = time_call(query.select('player', 'min', *rank_cols[:5]).fetch, repeats=repeats)
+        agg_time, aggregated = time_call(query.aggregate, rank_cols, repeats=repeats)
+
+    same_rows = scanned.reset_index(drop=True).equals(fetched)
+    expected_max = scanned[rank_cols].max().to_numpy()
+    same_max = bool(((aggregated[[f'{c}_max' for c in rank_cols]].iloc[0].to_numpy(dtype=float) == expected_max)
+                     | pd.isna(expected_max)).all())
+    print(f"  SELECT * + pandas filter: {scan_time * 1000:8.1f}ms")
+    print(f"  pushed-down fetch:        {fetch_time * 1000:8.1f}ms ({scan_time / fetch_time:.0f}x faster)")
+    print(f"  pushed-down, 7 columns:   {select_time * 1000:8.1f}ms ({scan_time / select_time:.0f}x faster)")
+    print(f"  SUM/MAX/weighted in SQL:  {agg_time * 1000:8.1f}ms")
+    print(f"  same rows: {same_rows}, same MAX: {same_max}")
+    return {'scan': scan_time, 'fetch': fetch_time, 'select': select_time, 'aggregate': agg_time, 'same_rows': same_rows}
+
+
+def benchmark_stats_backends(player_csv='all_player_season_stats.csv', repeats=3):
+    df = pd.read_csv(player_csv)
+    rank_cols = [col for col in df.columns if col not in common_keys]
+    print(f"Team aggregation by storage backend: {len(df)} player-seasons, {len(rank_cols)} stat columns")
+
+    _, expected = time_call(aggregate_team_stats_by_phase, df, rank_cols)
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('sqlite', 'duckdb'):
+            backend = get_backend(name, os.path.join(tmp, f'nba_stats.{name}'))
+            conn = backend.connect()
+            load_time, _ = time_call(backend.write_table, conn, df, 'player_season_stats')
+            if hasattr(backend, 'aggregate_team_stats'):
+                agg_time, team_df = time_call(backend.aggregate_team_stats, conn, rank_cols, PLAYER_ORDER_QUERY, FULL_GRID_PHASES,
+                                                repeats=repeats)
+            else:
+                # what aggregate_to_team_level does: every row into pandas, then aggregate
+                agg_time, team_df = time_call(
+                    lambda: aggregate_team_stats_by_phase(backend.read_query(conn, PLAYER_ORDER_QUERY), rank_cols), repeats=repeats
+                )
+            conn.close()
+            identical = team_df.to_csv(index=False) == expected.to_csv(index=False)
+            timings[name] = agg_time
+            print(f"  {name:6s}: load {load_time:6.3f}s, aggregate {agg_time:6.3f}s, identical CSV output: {identical}")
+
+    pandas_time, _ = time_call(aggregate_team_stats_by_phase, df, rank_cols, repeats=repeats)
+    timings['pandas'] = pandas_time
+    print(f"  pandas (frame already in memory): aggregate {pandas_time:6.3f}s")
+    return timings
+
+
+def derive_player_features_loop(combined_df):
+    """Original per-zone loop, kept as the reference for benchmark_feature_derivation; modifies combined_df in place"""
+    regexes = ["diff", "%_of_plays", "_freq_", "pts/play", "psa_rank", "_all_", "all_three", "all_mid", "2p%", "3p%"]
+    ""
+    # drop all columns matching the regexes
+    for regex in regexes:
+        combined_df.drop(list(combined_df.filter(regex=regex)), axis=1, inplace=True)
+
+    shooting_zones = ['rim', 'short_mid', 'long_mid', 'corner_three', 'non_corner']
+    for zone in shooting_zones:
+        # use regex to find zone frequency and accuracy columns
+        freq_col_regexes = [f'{zone}_frequency', f'_frequency:_{zone}']
+        acc_col_regexes = [f'{zone}_accuracy', f'_team_fg%:_{zone}']
+        freq_cols = []
+        acc_cols = []
+    
+        for i in range(len(freq_col_regexes)):
+            freq_col_regex = freq_col_regexes[i]
+            acc_col_regex = acc_col_regexes[i]
+            freq_cols += list(combined_df.filter(regex=freq_col_regex))
+            acc_cols += list(combined_df.filter(regex=acc_col_regex))
+        # create zone impact column (geometric mean of frequency and accuracy) using regex to find frequency and accuracy columns
+        for f_col, a_col in zip(freq_cols, acc_cols):
+            impact_col_name = f"{f_col.replace('_frequency','')}_impact"
+            combined_df[impact_col_name] = round(np.sqrt(combined_df[f_col] * combined_df[a_col]), 2)
+            # drop the original frequency and accuracy columns
+            combined_df.drop(columns=[f_col, a_col], inplace=True)
+    return combined_df
+
+
+def benchmark_feature_derivation(merged_csv_dir='merged_csvs', repeats=5):
+    with warnings.catch_warnings():
+        # read_season_csvs adds its columns to wide frames one at a time
+        warnings.simplefilter("ignore")
+        with redirect_stdout(io.StringIO()):
+            df = read_season_csvs(merged_csv_files(merged_csv_dir))
+    print(f"Player feature derivation: {len(df)} player-seasons, {df.shape[1]} merged columns")
+
+    # the loop works in place
+    loop_time, loop_df = time_call(lambda: derive_player_features_loop(df.copy()), repeats=repeats)
+    table_time, table_df = time_call(lambda: derive_player_features(df.copy()), repeats=repeats)
+    # both include the same df.copy()
+    identical = loop_df.to_csv(index=False) == table_df.to_csv(index=False)
+    n_impact = sum(col.endswith('_impact') for col in table_df.columns)
+    print(f"  per-zone loop:  {loop_time * 1000:8.1f}ms")
+    print(f"  pattern table:  {table_time * 1000:8.1f}ms ({loop_time / table_time:.1f}x faster, {n_impact} impact columns)")
+    print(f"  identical CSV output: {identical}")
+    return {'loop': loop_time, 'table': table_time, 'identical': identical}
+
+
+class StubLLMClient:
+    """
+    Stands in for ollama.Client while parsing the synthetic trades. Answers
+    every clause from its own "X traded A to Y (for B)" shape after a fixed
+    delay, and reports eval_count / eval_duration like the server does.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def chat(self, messages, model, format, options):
+        from trade_graph_builder import CLAUSE_RE, ASSET_SPLIT_RE
+        start = time.perf_counter()
+        clause = messages[-1]['content'].split('\n', 1)[1].strip()
+        transfers = []
+        match = CLAUSE_RE.match(clause)
+        if match:
+            for side, from_team, to_team in (('sent', 'from_team', 'to_team'), ('received', 'to_team', 'from_team')):
+                for part in ASSET_SPLIT_RE.split(match.group(side) or ''):
+                    if part.strip():
+                        asset = {'type': 'cash'} if 'cash' in part else {'type': 'player', 'name': part.strip()}
+                        transfers.append({'from_team': match.group(from_team), 'to_team': match.group(to_team), 'asset': asset})
+        content = json.dumps({'transfers': transfers})
+        time.sleep(self.latency)
+        return {
+            'message': {'content': content},
+            'eval_count': len(content) // 4,
+            'eval_duration': int((time.perf_counter() - start) * 1e9) or 1,
+        }
+
+
+# Synthetic stage bodies run inside the synthetic workspace. They take the suite
+# config as well as upstream; labels come from the synthetic team lists, since
+# sql_processor read the repo's when this module imported it
+
+def run_synthetic_merge(config, upstream):
+    from master_csv_creator import combine_seasons
+    refused = combine_seasons([season_label(year) for year in range(CTG_YEARS.start, CTG_YEARS.start + config['seasons'])])
+    if refused:
+        raise RuntimeError(f"Synthetic exports refused by the manifest check: {sorted(refused)}")
+
+
+def run_synthetic_load(config, upstream):
+    from master_csv_creator import MERGED_CSV_DIR
+    from sql_processor import load_seasons_to_db
+    return len(load_seasons_to_db(MERGED_CSV_DIR))
+
+
+def run_synthetic_aggregate(config, upstream):
+    from sql_processor import aggregate_to_team_level
+    return aggregate_to_team_level()
+
+
+def run_synthetic_label(config, upstream):
+    from sql_processor import LABELS, label_df
+    labels = {}
+    for name, (_, listed_value) in LABELS.items():
+        with open(LABEL_FILES[name]) as f:
+            labels[name] = (json.load(f), listed_value)
+    return label_df(upstream['aggregate'], labels)
+
+
+def run_synthetic_regression(config, upstream):
+    import regression
+    regression.main(cache_dir='model_cache', importance='grouped', search_params=BENCH_SEARCH_PARAMS)
+
+
+def run_synthetic_trades(config, upstream):
+    import trade_graph_builder
+    # cold LLM cache in the workspace, so every clause the rules miss reaches the stub
+    trade_graph_builder._client = StubLLMClient(config['llm_latency'])
+    trade_graph_builder.parse_trade_htmls()
+
+
+def run_synthetic_trade_graph(config, upstream):
+    from trade_graph_builder import TradeGraph
+    return len(TradeGraph.from_store().edges)
+
+
+# pipeline Stages, so with_dependencies resolves them; run(config, upstream) and no input hashing
+SYNTHETIC_STAGES = {stage.name: stage for stage in (
+    Stage('merge', run_synthetic_merge, inputs=(), outputs=()),
+    Stage('load', run_synthetic_load, inputs=(), outputs=(), deps=('merge',)),
+    Stage('aggregate', run_synthetic_aggregate, inputs=(), outputs=(), deps=('load',)),
+    Stage('label', run_synthetic_label, inputs=(), outputs=(), deps=('aggregate',)),
+    Stage('regression', run_synthetic_regression, inputs=(), outputs=(), deps=('label',)),
+    Stage('trades', run_synthetic_trades, inputs=(), outputs=()),
+    Stage('trade_graph', run_synthetic_trade_graph, inputs=(), outputs=(), deps=('trades',)),
+)}
+
+
+def synthetic_config(scale=1.0, seasons=len(CTG_YEARS), leagues=1, llm_share=0.2, llm_latency=0.0, seed=SYNTHETIC_SEED):
+    """What the generated data and the stub depend on; baselines are only compared against the same config"""
+    return {'scale': scale, 'seasons': seasons, 'leagues': leagues, 'llm_share': llm_share,
+            'llm_latency': llm_latency, 'seed': seed}
+
+
+def baseline_path(config, baseline_dir=BASELINE_DIR):
+    return Path(baseline_dir) / f"synthetic-x{config['scale']:g}-{config['seasons']}s-{config['leagues']}l.json"
+
+
+def benchmark_synthetic_stages(config, stages=None, repeats=STAGE_REPEATS, workdir=None):
+    """
+    Time every selected stage (plus what it depends on) on a synthetic
+    workspace generated from config, repeats times, each on a fresh
+    workspace since the stages skip work whose outputs exist. Every run is
+    a bench.<stage> sample, so the report has its median (p50). Stage
+    output goes to <stage>.log in the workspace; workspaces are deleted
+    unless workdir is given, which keeps them as workdir/run_<i>.
+    Returns the generated counts.
+    """
+    names = with_dependencies(stages or list(SYNTHETIC_STAGES), SYNTHETIC_STAGES)
+    keep = workdir is not None
+    root = Path(workdir) if keep else Path(tempfile.mkdtemp(prefix="bench_"))
+    if keep and root.exists() and any(root.iterdir()):
+        raise ValueError(f"{root} is not empty; the stages skip work whose outputs already exist")
+    seconds = {name: [] for name in names}
+    cwd = os.getcwd()
+    try:
+        for i in range(repeats):
+            run_dir = root / f"run_{i}"
+            counts = generate_workspace(run_dir, config['seasons'], config['scale'], config['leagues'],
+                                        config['llm_share'], config['seed'])
+            print(f"[bench] run {i + 1}/{repeats}: {counts['player_seasons']} regular-season player-seasons "
+                  f"({counts['seasons']} seasons, {counts['teams']} teams), {counts['trades']} trades in {run_dir}")
+            os.chdir(run_dir)
+            try:
+                upstream = {}
+                for name in names:
+                    start = time.perf_counter()
+                    with open(f"{name}.log", "w") as log, redirect_stdout(log):
+                        upstream[name] = SYNTHETIC_STAGES[name].run(config, upstream)
+                    seconds[name].append(time.perf_counter() - start)
+                    observe(f'bench.{name}', seconds[name][-1])
+                    print(f"[bench]   {name}: {seconds[name][-1]:.2f}s")
+            finally:
+                os.chdir(cwd)
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+    print(f"\nSynthetic stages (scale {config['scale']:g}, median of {repeats})")
+    width = max(map(len, names))
+    for name in names:
+        print(f"  {name:<{width}}  {np.median(seconds[name]):8.2f}s  (min {min(seconds[name]):.2f}s, max {max(seconds[name]):.2f}s)")
+    return counts
+
+
+def compare_synthetic_baseline(report_path, baseline, config, threshold=REGRESSION_THRESHOLD, floor=STAGE_FLOOR_SECONDS):
+    """bench.* stage medians of report_path against baseline; True if a stage regressed"""
+    with open(baseline) as f_old, open(report_path) as f_new:
+        old, new = json.load(f_old), json.load(f_new)
+    if old.get('config') != config:
+        raise SystemExit(f"{baseline} was recorded with {old.get('config')}, not {config}")
+    # only whole stages gate the run; the timers inside them are in both reports for digging in
+    rows = [row for row in compare_reports(old, new, threshold, sample_field='p50', floor=floor)
+            if row['name'].startswith('bench.') and row['field'] == 'p50']
+    width = max((len(row['name']) for row in rows), default=0)
+    print(f"\nAgainst {baseline} (medians; stages under {floor:g}s on both sides do not gate):")
+    for row in rows:
+        flag = "  REGRESSION" if row['regression'] else ""
+        print(f"  {row['name']:<{width}}  {row['old']:9.2f}s -> {row['new']:9.2f}s ({row['change']:+.1%}){flag}")
+    return any(row['regression'] for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the optimized code paths against their references on the repo data, "
+                                                 "or with --synthetic every stage on generated data against a stored baseline")
+    parser.add_argument('--synthetic', action='store_true', help='run the synthetic stage benchmarks (offline) instead')
+    parser.add_argument('--stages', nargs='+', default=None, metavar='STAGE',
+                        help=f"synthetic stages to time, with their dependencies (default: all); one of {', '.join(SYNTHETIC_STAGES)}")
+    parser.add_argument('--repeats', type=int, default=STAGE_REPEATS, help='fresh workspaces each synthetic stage is timed on')
+    parser.add_argument('--scale', type=float, default=1.0, help='players per team and trades per year, relative to the real data')
+    parser.add_argument('--seasons', type=int, default=len(CTG_YEARS), help='synthetic seasons from 2003-04 on')
+    parser.add_argument('--leagues', type=int, default=1, help='groups of 30 teams')
+    parser.add_argument('--llm-share', type=float, default=0.2, help='share of trades the rule parser hands to the (stub) model')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='seconds the stub model takes per clause')
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_SEED)
+    parser.add_argument('--workdir', default=None, help='keep the synthetic workspaces here (must be empty) instead of a temporary directory')
+    parser.add_argument('--baseline', default=None, help=f'baseline report (default: {BASELINE_DIR}/synthetic-x<scale>-<seasons>s-<leagues>l.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline instead of comparing against it')
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help='pass when there is no baseline to compare against (by default that fails the run)')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='relative slowdown of a stage median that fails the run')
+    parser.add_argument('--floor', type=float, default=STAGE_FLOOR_SECONDS, help='seconds under which a stage never fails the run')
+    args = parser.parse_args()
+
+    if not args.synthetic:
+        benchmark_team_aggregation()
+        benchmark_trade_extraction()
+        benchmark_trade_graph()
+        benchmark_trade_store()
+        benchmark_feature_store()
+        benchmark_permutation_importance()
+        benchmark_csv_merge()
+        benchmark_player_query()
+        benchmark_stats_backends()
+        benchmark_feature_derivation()
+    else:
+        config = synthetic_config(args.scale, args.seasons, args.leagues, args.llm_share, args.llm_latency, args.seed)
+        baseline = Path(args.baseline) if args.baseline else baseline_path(config)
+        if not (args.save_baseline or args.allow_missing_baseline or baseline.exists()):
+            # checked before the run: a gate with nothing to compare against must not pass
+            raise SystemExit(f"No baseline at {baseline}; store one with --save-baseline "
+                             f"or pass --allow-missing-baseline")
+        counts = benchmark_synthetic_stages(config, args.stages, args.repeats, args.workdir)
+        report_path = write_report('benchmarks', extra={'config': config, 'generated': counts, 'repeats': args.repeats})
+        if args.save_baseline:
+            baseline.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(report_path, baseline)
+            print(f"Saved baseline {baseline}")
+        elif not baseline.exists():
+            print(f"No baseline at {baseline}; not compared (--allow-missing-baseline)")
+        elif compare_synthetic_baseline(report_path, baseline, config, args.threshold, args.floor):
+            raise SystemExit(1)
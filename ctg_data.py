@@ -0,0 +1,193 @@
+import io
+import os
+import csv
+import json
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+
+# Layout of the Cleaning the Glass exports, shared by the browser and HTTP downloaders
+CTG_URL = "https://cleaningtheglass.com/stats/players"
+CTG_CSV_DIR = Path("CTG_CSV_Data")
+CTG_SEASON_PHASES = ("Regular Season", "Playoffs")
+CTG_YEARS = range(2003, 2024)
+CTG_CATEGORIES = {
+    "Offensive Overview": "offensive_overview",
+    "Shooting Overall": "shooting_overall",
+    "Shooting Frequency": "shooting_frequency",
+    "Shooting Accuracy": "shooting_accuracy",
+    "Defense and Rebounding": "defense_rebounding",
+    "Foul Drawing": "foul_drawing",
+    "OnOff Efficiency and Four Factors": "onoff_efficiency",
+    "OnOff Team Shooting Frequency": "onoff_team_shooting_frequency",
+    "OnOff Team Shooting Accuracy": "onoff_team_shooting_accuracy",
+    "OnOff Team Halfcourt & Putbacks": "onoff_team_halfcourt_putbacks",
+    "OnOff Team Transition": "onoff_team_transition",
+    "OnOff Opponent Shooting Frequency": "onoff_opponent_shooting_frequency",
+    "OnOff Opponent Shooting Accuracy": "onoff_opponent_shooting_accuracy",
+    "OnOff Opponent Halfcourt & Putbacks": "onoff_opponent_halfcourt_putbacks",
+    "OnOff Opponent Transition": "onoff_opponent_transition"
+}
+
+
+def season_label(year):
+    return f"{year}-{str(year + 1)[2:4]}"
+
+
+def ctg_filename(category_name, selected_season_phase):
+    return f"{category_name.replace(' ', '_')}_{selected_season_phase.replace(' ', '_')}.csv"
+
+
+def ctg_path(year, selected_season_phase, category_name, root=CTG_CSV_DIR):
+    return Path(root) / season_label(year) / ctg_filename(category_name, selected_season_phase)
+
+
+MANIFEST_FILE = "manifest.json"
+# a category with fewer rows than this share of its season/phase siblings is a truncated export
+TRUNCATION_RATIO = 0.9
+
+
+def inspect_csv(path):
+    """Size, sha256, data rows and whether every row has the header's field count (CTG omits the final newline)"""
+    content = Path(path).read_bytes()
+    rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+    header, records = (rows[0], rows[1:]) if rows else ([], [])
+    return {
+        "size": len(content),
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "rows": len(records),
+        "complete": bool(header) and all(len(r) == len(header) for r in records),
+    }
+
+
+class CTGManifest:
+    """
+    CTG_CSV_Data/manifest.json: one entry per export (season, phase, category,
+    size, sha256, rows, fetched_at, plus ETag/Last-Modified from ctg_http),
+    keyed by the file's path under the data root. status is "ok" for a saved
+    export and "empty" for a category the site has no export for, which the
+    downloaders do not retry.
+    """
+
+    def __init__(self, root=CTG_CSV_DIR):
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_FILE
+        self.entries = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.lock = threading.Lock()
+
+    def key(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def get(self, path):
+        with self.lock:
+            return self.entries.get(self.key(path), {})
+
+    def is_downloaded(self, path):
+        return self.get(path).get("status") == "ok"
+
+    def is_known_empty(self, path):
+        return self.get(path).get("status") == "empty"
+
+    def _describe(self, path):
+        path = Path(path)
+        phase = next(p for p in CTG_SEASON_PHASES if path.stem.endswith(p.replace(" ", "_")))
+        return {
+            "season": path.parent.name,
+            "phase": phase,
+            "category": path.stem[:-len(phase) - 1].replace("_", " "),
+        }
+
+    def record(self, path, fetched_at=None, **extra):
+        info = inspect_csv(path)
+        del info["complete"]
+        entry = dict(self._describe(path), **info, status="ok",
+                     fetched_at=fetched_at or datetime.now(timezone.utc).isoformat(timespec="seconds"), **extra)
+        with self.lock:
+            self.entries[self.key(path)] = entry
+        return entry
+
+    def update(self, path, **fields):
+        with self.lock:
+            self.entries.setdefault(self.key(path), {}).update(fields)
+
+    def mark_empty(self, path):
+        with self.lock:
+            self.entries[self.key(path)] = dict(self._describe(path), status="empty",
+                                                fetched_at=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            content = json.dumps(self.entries, indent=1, sort_keys=True) + "\n"
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp_", suffix=".json")
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def rebuild(self):
+        """Index every export on disk; files whose hash did not change keep their fetched_at and validators"""
+        exports = {ctg_filename(name, phase) for name in CTG_CATEGORIES for phase in CTG_SEASON_PHASES}
+        for path in sorted(p for p in self.root.glob("*/*.csv") if p.name in exports):
+            previous = self.get(path)
+            info = inspect_csv(path)
+            if previous.get("sha256") == info["sha256"]:
+                continue
+            mtime = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat(timespec="seconds")
+            self.record(path, fetched_at=mtime)
+        return self
+
+    def problems(self, paths):
+        """
+        Why each of one season/phase's exports should not be merged: missing,
+        not indexed, changed or partially written since it was fetched, a
+        cut-off last row, or far fewer rows than its sibling categories.
+        """
+        found = {}
+        for path in map(Path, paths):
+            entry = self.get(path)
+            if entry.get("status") == "empty":
+                found[path] = "no export for this category (known empty)"
+            elif not path.exists():
+                found[path] = "missing"
+            elif not entry:
+                found[path] = "not in the manifest (run python ctg_data.py --rebuild)"
+        rows = {path: self.get(path).get("rows", 0) for path in map(Path, paths) if path not in found}
+        most_rows = max(rows.values(), default=0)
+        for path in rows:
+            entry = self.get(path)
+            if path.stat().st_size != entry["size"]:
+                found[path] = f"size {path.stat().st_size} != {entry['size']} in the manifest (partial or changed download)"
+                continue
+            info = inspect_csv(path)
+            if info["sha256"] != entry["sha256"]:
+                found[path] = "content changed since it was indexed"
+            elif not info["complete"]:
+                found[path] = "last row cut off"
+            elif info["rows"] < TRUNCATION_RATIO * most_rows:
+                found[path] = f"truncated: {info['rows']} rows vs {most_rows} in other categories"
+        return {str(path): reason for path, reason in found.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index the CTG exports in CTG_CSV_Data/manifest.json")
+    parser.add_argument('--rebuild', action='store_true', help='(re)index every file on disk')
+    parser.add_argument('--check', action='store_true', help='list exports the merger would refuse')
+    args = parser.parse_args()
+    manifest = CTGManifest()
+    if args.rebuild:
+        manifest.rebuild().save()
+        print(f"Indexed {len(manifest.entries)} exports in {manifest.path}")
+    if args.check:
+        for season_dir in sorted(p for p in CTG_CSV_DIR.iterdir() if p.is_dir() and not p.name.startswith(".")):
+            for phase in CTG_SEASON_PHASES:
+                paths = [season_dir / ctg_filename(name, phase) for name in CTG_CATEGORIES]
+                for path, reason in manifest.problems(paths).items():
+                    print(f"{path}: {reason}")
@@ -0,0 +1,215 @@
+import os
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ctg_data import CTG_URL, CTG_CSV_DIR, CTG_SEASON_PHASES, CTG_YEARS, CTG_CATEGORIES, CTGManifest, ctg_path
+
+# CSV export endpoint; point it at serve_fixtures() to run without the real site
+CTG_EXPORT_URL = os.getenv("CTG_EXPORT_URL", CTG_URL)
+# Cookie header of a logged-in browser session, e.g. "sessionid=...; csrftoken=..."
+CTG_SESSION_COOKIE = os.getenv("CTG_SESSION_COOKIE", "")
+FETCH_WORKERS = 4
+# ASSUMED, not taken from the site: CTG documents no CSV endpoint. season and
+# stat_category are the page URL the browser downloader opens, but the browser
+# picks the phase from a dropdown and clicks a download button, so season_type
+# and format=csv are placeholders only FixtureHandler reads. Check them against
+# the request the download button makes before pointing this at the real site.
+PHASE_PARAMS = {
+    "Regular Season": "regular_season",
+    "Playoffs": "playoffs",
+}
+SLUG_CATEGORIES = {slug: name for name, slug in CTG_CATEGORIES.items()}
+
+
+def export_params(year, selected_season_phase, category_name):
+    """Query string of one export: the page URL the browser downloader opens, plus the assumed season_type and format"""
+    return {
+        "season": year,
+        "stat_category": CTG_CATEGORIES[category_name],
+        "season_type": PHASE_PARAMS[selected_season_phase],
+        "format": "csv",
+    }
+
+
+def make_session(cookie=CTG_SESSION_COOKIE, pool_size=FETCH_WORKERS, retries=3):
+    """One keep-alive connection pool shared by every fetch thread"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept"] = "text/csv"
+    if cookie:
+        session.headers["Cookie"] = cookie
+    return session
+
+
+def atomic_write(path, content):
+    # readers (master_csv_creator, a second fetch) only ever see a complete file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp_", suffix=path.suffix)
+    os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def response_validators(response):
+    return {k: response.headers[h] for k, h in (("etag", "ETag"), ("last_modified", "Last-Modified")) if h in response.headers}
+
+
+def fetch_export(session, year, selected_season_phase, category_name, manifest, url=CTG_EXPORT_URL, root=CTG_CSV_DIR, refresh=False):
+    """
+    GET one export into CTG_CSV_Data/<season>/ and record it in the manifest.
+    Exports the manifest already has are skipped unless refresh, which sends a
+    conditional request so unchanged files come back as an empty 304.
+    Categories the site has no export for (404) are remembered and not retried.
+    Returns "fetched", "not modified", "skipped", "known empty" or "missing".
+    """
+    path = ctg_path(year, selected_season_phase, category_name, root)
+    if manifest.is_known_empty(path):
+        return "known empty"
+    if manifest.is_downloaded(path) and path.exists() and not refresh:
+        return "skipped"
+    headers = {}
+    if path.exists():
+        known = manifest.get(path)
+        if "etag" in known:
+            headers["If-None-Match"] = known["etag"]
+        headers["If-Modified-Since"] = known.get("last_modified") or formatdate(path.stat().st_mtime, usegmt=True)
+
+    response = session.get(url, params=export_params(year, selected_season_phase, category_name), headers=headers, timeout=30)
+    if response.status_code == 304:
+        if manifest.is_downloaded(path):
+            manifest.update(path, **response_validators(response))
+        else:
+            manifest.record(path, **response_validators(response))
+        return "not modified"
+    if response.status_code == 404:
+        manifest.mark_empty(path)
+        return "missing"
+    response.raise_for_status()
+    if "html" in response.headers.get("Content-Type", ""):
+        # an expired cookie gets the login page instead of a CSV
+        raise PermissionError(f"{response.url} returned HTML, is CTG_SESSION_COOKIE still valid?")
+    atomic_write(path, response.content)
+    manifest.record(path, **response_validators(response))
+    return "fetched"
+
+
+def fetch_all(years=CTG_YEARS, phases=CTG_SEASON_PHASES, url=CTG_EXPORT_URL, root=CTG_CSV_DIR, workers=FETCH_WORKERS, session=None,
+              refresh=False):
+    """Fetch every (season, phase, category) export over one pooled session; returns {status: count}"""
+    session = session or make_session(pool_size=workers)
+    manifest = CTGManifest(root)
+    jobs = [(year, phase, category_name) for year in years for phase in phases for category_name in CTG_CATEGORIES]
+
+    def fetch(job):
+        try:
+            return fetch_export(session, *job, manifest, url, root, refresh)
+        except (requests.RequestException, PermissionError) as e:
+            print(f"Error fetching {job}: {e}")
+            return "failed"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = list(pool.map(fetch, jobs))
+    manifest.save()
+    counts = {status: statuses.count(status) for status in sorted(set(statuses))}
+    print(f"{len(jobs)} exports in {time.perf_counter() - start:.2f}s: {counts}")
+    return counts
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the CTG export endpoint that serves files from a local
+    CTG_CSV_Data tree, with ETag / Last-Modified and 304 handling. Set
+    server.required_cookie to make it reject requests without that cookie.
+    """
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        phases = {param: phase for phase, param in PHASE_PARAMS.items()}
+        try:
+            path = ctg_path(int(query["season"]), phases[query["season_type"]], SLUG_CATEGORIES[query["stat_category"]], self.server.root)
+        except (KeyError, ValueError):
+            return self.send_error(400)
+        cookie = self.server.required_cookie
+        if cookie and cookie not in self.headers.get("Cookie", ""):
+            return self._send(200, b"<html>login</html>", {"Content-Type": "text/html"})
+        if not path.exists():
+            return self.send_error(404)
+
+        content = path.read_bytes()
+        etag = '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+        last_modified = formatdate(int(path.stat().st_mtime), usegmt=True)
+        headers = {"ETag": etag, "Last-Modified": last_modified}
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_none_match is not None:
+            not_modified = if_none_match == etag
+        elif if_modified_since is not None:
+            not_modified = int(path.stat().st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        else:
+            not_modified = False
+        if not_modified:
+            return self._send(304, b"", headers)
+        self._send(200, content, dict(headers, **{"Content-Type": "text/csv"}))
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(root=CTG_CSV_DIR, host="127.0.0.1", port=0, required_cookie=""):
+    """Start the stand-in server in a daemon thread; returns (server, export url)"""
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.root = Path(root)
+    server.required_cookie = required_cookie
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/stats/players"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the CTG CSV exports over HTTP, without a browser")
+    parser.add_argument('--url', default=CTG_EXPORT_URL, help='export endpoint (default: $CTG_EXPORT_URL or the CTG stats page)')
+    parser.add_argument('--out', default=str(CTG_CSV_DIR), help='data root to write <season>/<Category>_<Phase>.csv into')
+    parser.add_argument('--workers', type=int, default=FETCH_WORKERS, help='parallel requests over the shared connection pool')
+    parser.add_argument('--refresh', action='store_true', help='revalidate exports the manifest already has (conditional requests)')
+    parser.add_argument('--serve', metavar='ROOT', help='instead of fetching, serve ROOT as a stand-in export endpoint')
+    parser.add_argument('--port', type=int, default=8765, help='port for --serve')
+    args = parser.parse_args()
+    if args.serve:
+        server, url = serve_fixtures(args.serve, port=args.port)
+        print(f"Serving {args.serve} at {url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        fetch_all(url=args.url, root=args.out, workers=args.workers, refresh=args.refresh)
@@ -0,0 +1,70 @@
+import numpy as np
+from scipy.cluster.hierarchy import linkage, fcluster
+from scipy.spatial.distance import squareform
+from scipy.stats import rankdata
+from model_search import model_key
+from importance import feature_groups
+
+SCREEN_MODES = ("cluster", "group")
+
+
+def abs_spearman(X):
+    """|Spearman rho| between every pair of columns; constant columns correlate with nothing"""
+    ranks = rankdata(X, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = np.abs(np.corrcoef(ranks, rowvar=False))
+    corr = np.nan_to_num(corr)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def correlation_clusters(corr, threshold):
+    """Average-linkage clusters on 1 - |rho|; members of a cluster correlate >= threshold on average"""
+    distance = 1.0 - corr
+    np.fill_diagonal(distance, 0.0)
+    Z = linkage(squareform(distance, checks=False), method="average")
+    labels = fcluster(Z, t=1.0 - threshold, criterion="distance")
+    clusters = {}
+    for i, label in enumerate(labels):
+        clusters.setdefault(label, []).append(i)
+    return list(clusters.values())
+
+
+def representative(corr, members):
+    """The member most correlated with the rest of its cluster"""
+    if len(members) == 1:
+        return members[0]
+    block = corr[np.ix_(members, members)]
+    return members[int(np.argmax(block.sum(axis=1)))]
+
+
+def screen_features(X, columns, mode="cluster", threshold=0.8, suffixes=(), cache=None):
+    """
+    Names of the columns to keep, one per correlation cluster (mode="cluster")
+    or one per stat's group of aggregations (mode="group"), in their original order.
+    The selection is unsupervised, so it can run once on the whole dataset
+    without leaking labels into the outer folds.
+    """
+    if mode not in SCREEN_MODES:
+        raise ValueError(f"Unknown screen mode: {mode}")
+    columns = list(columns)
+    key = None
+    if cache is not None:
+        # keyed on the feature matrix alone; screening never looks at the labels
+        key = model_key(X, np.zeros(0), stage="screen", mode=mode, threshold=threshold,
+                        suffixes=list(suffixes), columns=columns)
+        kept = cache.get(key)
+        if kept is not None:
+            return kept
+
+    corr = abs_spearman(X)
+    if mode == "cluster":
+        groups = correlation_clusters(corr, threshold)
+    else:
+        groups = list(feature_groups(columns, suffixes).values())
+    keep = sorted(representative(corr, members) for members in groups)
+    kept = [columns[i] for i in keep]
+
+    if cache is not None:
+        cache.put(key, kept)
+    return kept
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+FEATURE_STORE_DIR = "feature_store"
+
+# CSV exports the store replaces; used to seed the store on first read
+FEATURE_CSVS = {
+    "player_season_stats": "all_player_season_stats.csv",
+    "team_aggregated_stats": "team_aggregated_stats.csv",
+    "team_aggregated_stats_labeled": "team_aggregated_stats_labeled.csv",
+}
+
+
+def feature_path(name, store_dir=FEATURE_STORE_DIR):
+    return os.path.join(store_dir, f"{name}.arrow")
+
+
+def write_features(df, name, store_dir=FEATURE_STORE_DIR):
+    """Uncompressed Feather v2 (Arrow IPC) so readers can memory-map it; written atomically"""
+    os.makedirs(store_dir, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, prefix=".tmp_", suffix=".arrow")
+    os.close(fd)
+    os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+    try:
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, feature_path(name, store_dir))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def import_csv(name, store_dir=FEATURE_STORE_DIR):
+    df = pd.read_csv(FEATURE_CSVS[name])
+    # label_df used to write the index as an unnamed column
+    df = df.drop(columns=[c for c in df.columns if c.startswith("Unnamed:")])
+    write_features(df, name, store_dir)
+
+
+def feature_columns(name, store_dir=FEATURE_STORE_DIR):
+    """Column names from the file footer, without reading any data"""
+    path = feature_path(name, store_dir)
+    if not os.path.exists(path) and name in FEATURE_CSVS:
+        import_csv(name, store_dir)
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def read_features(name, columns=None, store_dir=FEATURE_STORE_DIR):
+    """Memory-mapped read of only the requested columns"""
+    path = feature_path(name, store_dir)
+    if not os.path.exists(path) and name in FEATURE_CSVS:
+        import_csv(name, store_dir)
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the feature store from the CSV exports")
+    parser.add_argument("--rebuild", action="store_true", help="re-import CSVs that already have a store file")
+    args = parser.parse_args()
+    for name, csv_file in FEATURE_CSVS.items():
+        if os.path.exists(csv_file) and (args.rebuild or not os.path.exists(feature_path(name))):
+            import_csv(name)
+            print(f"Imported {csv_file} -> {feature_path(name)}")
@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import multiprocessing
+import pstats
+import cProfile
+import platform
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import numpy as np
+
+# Run reports land here, one JSON file per run: <run>-<UTC timestamp>.json
+RUN_REPORT_DIR = os.getenv("RUN_REPORT_DIR", "run_reports")
+# Comma separated: "cprofile" and/or "tracemalloc" inside profiled() blocks; off by default
+PROFILE_MODES = {mode for mode in os.getenv("INSTRUMENT_PROFILE", "").split(",") if mode}
+PROFILE_TOP_FUNCTIONS = 25
+# compare: a timer or sample mean this much slower than the old report is a regression
+REGRESSION_THRESHOLD = 0.2
+
+
+class RunMetrics:
+    """
+    Timers (calls / total / max seconds), counters, raw samples (e.g. LLM
+    latency per clause) and profiler captures for one process. Thread safe;
+    worker processes hand theirs to the parent with drain() -> merge().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc)
+        self.timers = {}
+        self.counters = {}
+        self.samples = {}
+        self.profiles = {}
+        self.memory = {}
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0})
+            timer['calls'] += 1
+            timer['total_s'] += seconds
+            timer['max_s'] = max(timer['max_s'], seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self.lock:
+            self.samples.setdefault(name, []).append(float(value))
+
+    def add_profile(self, name, profiler):
+        # (file, line, function) -> [primitive calls, calls, own seconds, cumulative seconds], summed over runs
+        stats = pstats.Stats(profiler).stats
+        with self.lock:
+            functions = self.profiles.setdefault(name, {})
+            for (file, line, function), (cc, nc, tt, ct, _) in stats.items():
+                key = f"{file}:{line}({function})"
+                totals = functions.setdefault(key, [0, 0, 0.0, 0.0])
+                for i, value in enumerate((cc, nc, tt, ct)):
+                    totals[i] += value
+
+    def add_memory(self, name, peak_bytes):
+        with self.lock:
+            self.memory[name] = max(self.memory.get(name, 0), peak_bytes)
+
+    def drain(self):
+        """Everything recorded so far, as plain data, and reset; for returning from pool workers"""
+        with self.lock:
+            snapshot = {'timers': self.timers, 'counters': self.counters, 'samples': self.samples,
+                        'profiles': self.profiles, 'memory': self.memory}
+            self.timers, self.counters, self.samples, self.profiles, self.memory = {}, {}, {}, {}, {}
+        return snapshot
+
+    def merge(self, snapshot):
+        with self.lock:
+            for name, other in snapshot['timers'].items():
+                timer = self.timers.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0})
+                timer['calls'] += other['calls']
+                timer['total_s'] += other['total_s']
+                timer['max_s'] = max(timer['max_s'], other['max_s'])
+            for name, n in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for name, values in snapshot['samples'].items():
+                self.samples.setdefault(name, []).extend(values)
+            for name, functions in snapshot['profiles'].items():
+                merged = self.profiles.setdefault(name, {})
+                for key, other in functions.items():
+                    merged[key] = [a + b for a, b in zip(merged.get(key, [0, 0, 0.0, 0.0]), other)]
+            for name, peak in snapshot['memory'].items():
+                self.memory[name] = max(self.memory.get(name, 0), peak)
+
+    def report(self, run):
+        with self.lock:
+            timers = {name: dict(t, mean_s=t['total_s'] / t['calls']) for name, t in sorted(self.timers.items())}
+            samples = {}
+            for name, values in sorted(self.samples.items()):
+                values = np.array(values)
+                samples[name] = {
+                    'count': len(values), 'total': float(values.sum()), 'mean': float(values.mean()),
+                    'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+                    'max': float(values.max()),
+                }
+            profiles = {
+                name: [
+                    {'function': key, 'calls': nc, 'primitive_calls': cc, 'tottime_s': tt, 'cumtime_s': ct}
+                    for key, (cc, nc, tt, ct) in sorted(functions.items(), key=lambda item: -item[1][3])[:PROFILE_TOP_FUNCTIONS]
+                ]
+                for name, functions in sorted(self.profiles.items())
+            }
+            return {
+                'run': run,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'argv': sys.argv,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'profile_modes': sorted(PROFILE_MODES),
+                'timers': timers,
+                'counters': dict(sorted(self.counters.items())),
+                'samples': samples,
+                'profiles': profiles,
+                'memory_peak_mb': {name: peak / 2**20 for name, peak in sorted(self.memory.items())},
+            }
+
+
+METRICS = RunMetrics()
+# cProfile allows one active profiler per process, so nested or concurrent profiled() blocks only time
+_profiler_lock = threading.Lock()
+_active_profiler = None
+
+
+def reset_worker_metrics():
+    """
+    Start a pool worker with empty metrics rather than a copy of the parent's,
+    so drain() hands back only what the worker recorded. Runs after every fork
+    where the platform has one, and as the initializer of the pools below.
+    """
+    global _profiler_lock, _active_profiler
+    if _active_profiler is not None:
+        _active_profiler.disable()
+        _active_profiler = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    METRICS.__init__()
+    _profiler_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    # also frees a metrics or profiler lock another thread held at fork time
+    os.register_at_fork(after_in_child=reset_worker_metrics)
+# Process pools whose workers send METRICS.drain() back pass this and initializer=reset_worker_metrics.
+# spawn rather than fork: the pipeline starts these pools from a stage thread while the trades
+# stage and its LLM pool run, and a fork would copy locks (pandas, BLAS, sqlite) those threads hold
+WORKER_CONTEXT = multiprocessing.get_context('spawn')
+
+
+@contextmanager
+def timed(name):
+    """Wall-clock timer; works as `with timed(name):` and as `@timed(name)`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.add_time(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    METRICS.count(name, n)
+
+
+def observe(name, value):
+    METRICS.observe(name, value)
+
+
+@contextmanager
+def profiled(name):
+    """timed(name), plus a cProfile and/or tracemalloc capture of the block when INSTRUMENT_PROFILE asks for one"""
+    global _active_profiler
+    profiler, lock = None, _profiler_lock
+    if 'cprofile' in PROFILE_MODES and lock.acquire(blocking=False):
+        profiler = _active_profiler = cProfile.Profile()
+    trace = 'tracemalloc' in PROFILE_MODES and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    try:
+        with timed(name):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        if profiler is not None:
+            _active_profiler = None
+            METRICS.add_profile(name, profiler)
+            lock.release()
+        if trace:
+            METRICS.add_memory(name, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+
+def write_report(run, report_dir=RUN_REPORT_DIR, extra=None):
+    """Write this process's metrics, plus any extra top-level fields, to <report_dir>/<run>-<timestamp>.json; returns the path"""
+    report = dict(METRICS.report(run), **(extra or {}))
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    path = os.path.join(report_dir, f"{run}-{stamp}.json")
+    fd, tmp_path = tempfile.mkstemp(dir=report_dir, prefix=".tmp_", suffix=".json")
+    os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(report, f, indent=1)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    print(f"Run report: {path}")
+    return path
+
+
+def compare_reports(old, new, threshold=REGRESSION_THRESHOLD, sample_field='mean', floor=0.0):
+    """
+    Timer totals and sample means (or sample_field, e.g. p50) present in both
+    reports; rows slower by more than threshold are regressions, unless old
+    and new are both under floor, where run-to-run noise outweighs the change.
+    """
+    rows = []
+    for section, field in (('timers', 'total_s'), ('samples', sample_field)):
+        for name in sorted(set(old[section]) & set(new[section])):
+            before, after = old[section][name][field], new[section][name][field]
+            change = (after - before) / before if before else 0.0
+            # throughput samples get better as they grow
+            slower = -change if name.endswith('_per_s') else change
+            rows.append({'name': name, 'field': field, 'old': before, 'new': after,
+                         'change': change, 'regression': slower > threshold and max(before, after) >= floor})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two run reports written by instrumentation.write_report")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='relative slowdown that counts as a regression')
+    args = parser.parse_args()
+    with open(args.old) as f_old, open(args.new) as f_new:
+        rows = compare_reports(json.load(f_old), json.load(f_new), args.threshold)
+    width = max((len(row['name']) for row in rows), default=0)
+    for row in rows:
+        flag = "  REGRESSION" if row['regression'] else ""
+        print(f"{row['name']:<{width}}  {row['field']:<7} {row['old']:12.4f} -> {row['new']:12.4f} ({row['change']:+.1%}){flag}")
+    if any(row['regression'] for row in rows):
+        raise SystemExit(1)
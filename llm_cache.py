@@ -0,0 +1,110 @@
+import sqlite3
+import hashlib
+import threading
+import time
+
+# a hit only rewrites last_used once it is this many seconds old, so repeated hits stay read-only;
+# eviction order is only as fine as this
+RECENCY_RESOLUTION = 3600.0
+
+
+def cache_key(*parts: str) -> str:
+    """Content address for an LLM request: sha256 over every input that can change the answer"""
+    sha = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode('utf-8')
+        # length prefix so ("ab", "c") and ("a", "bc") never collide
+        sha.update(len(encoded).to_bytes(8, 'big'))
+        sha.update(encoded)
+    return sha.hexdigest()
+
+
+class ClauseCache:
+    """
+    Persistent SQLite store of parsed clause JSON keyed by cache_key().
+    Least recently used entries are evicted once max_entries is exceeded.
+    Safe to share between worker threads. The entry count is kept in memory
+    and only re-read from the file when it says the cache is full, since
+    parallel year workers may have added rows of their own.
+    """
+
+    def __init__(self, db_path: str = "llm_cache.db", max_entries: int = 50000,
+                 recency_resolution: float = RECENCY_RESOLUTION):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.recency_resolution = recency_resolution
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # generous timeout: parallel year workers share the same file
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS clause_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_clause_cache_last_used ON clause_cache (last_used)")
+        self._conn.commit()
+        self._entries = self._count()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM clause_cache").fetchone()[0]
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value, last_used FROM clause_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            value, last_used = row
+            now = time.time()
+            if now - last_used >= self.recency_resolution:
+                self._conn.execute("UPDATE clause_cache SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            return value
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO clause_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            ).rowcount
+            if inserted:
+                self._entries += 1
+                if self._entries > self.max_entries:
+                    self._evict()
+            else:
+                self._conn.execute("UPDATE clause_cache SET value = ?, last_used = ? WHERE key = ?", (value, now, key))
+            self._conn.commit()
+
+    def _evict(self):
+        self._entries = self._count()
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM clause_cache WHERE key IN "
+                "(SELECT key FROM clause_cache ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+            self._entries -= overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,13 +1,165 @@
 import pandas as pd
 import os
+import argparse
 from pathlib import Path
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+from ctg_data import CTG_CSV_DIR, CTGManifest
+from instrumentation import WORKER_CONTEXT, METRICS, count, reset_worker_metrics, profiled, write_report
+
+MERGED_CSV_DIR = Path("merged_csvs")
+# phase -> merged CSV subdirectory; sql_processor loads every phase into one table keyed by phase
+PHASE_SUBDIRS = {
+    "Regular_Season": "",
+    "Playoffs": "playoffs",
+}
+PHASES = {phase: MERGED_CSV_DIR / subdir for phase, subdir in PHASE_SUBDIRS.items()}
+SEASONS = [f"{year}-{str(year+1)[-2:]}" for year in range(2003, 2024)]
+
+common_keys = ['Player', 'Team', 'Age', 'Pos', 'MIN']
+JOIN_KEYS = ['Player', 'Team']
+# the on/off exports still use franchise codes from before relocations/renames
+TEAM_ALIASES = {"NJN": "BKN", "NOH": "NOP", "SEA": "OKC"}
+
+
+class CategorySchema(NamedTuple):
+    name: str                  # file name before _<phase>.csv
+    prefix: str = ""           # prepended to every kept column
+    shooting_label: str = ""   # shooting tables: "Rim Rank" -> "Rim_<label>_Rank"
+    exclude: tuple = ()        # rank columns already provided by an earlier category
+
+    def keep(self, column):
+        return column.endswith(" Rank") and column not in self.exclude
+
+    def column_name(self, column):
+        if self.shooting_label and column != "eFG% Rank":
+            column = f"{column[:-len(' Rank')]}_{self.shooting_label}_Rank"
+        return self.prefix + column
+
+
+# Merged column order follows this list; the first category supplies Age/Pos/MIN and the row order
+CATEGORY_SCHEMAS = [
+    CategorySchema("Defense_and_Rebounding"),
+    CategorySchema("Foul_Drawing"),
+    CategorySchema("Offensive_Overview"),
+    CategorySchema("OnOff_Efficiency_and_Four_Factors"),
+    CategorySchema("OnOff_Opponent_Halfcourt_&_Putbacks", prefix="OnOff_Opp_HalfCourt_", exclude=("Pts/Poss Rank",)),
+    CategorySchema("OnOff_Opponent_Shooting_Accuracy", prefix="OnOff_Opp_", exclude=("eFG% Rank",)),
+    CategorySchema("OnOff_Opponent_Shooting_Frequency", prefix="OnOff_Opp_", exclude=("eFG% Rank",)),
+    CategorySchema("OnOff_Opponent_Transition", prefix="OnOff_Opp_Transition_", exclude=("Pts/Poss Rank",)),
+    CategorySchema("OnOff_Team_Halfcourt_&_Putbacks", prefix="OnOff_Team_HalfCourt_", exclude=("Pts/Poss Rank",)),
+    CategorySchema("OnOff_Team_Shooting_Accuracy", prefix="OnOff_Team_", exclude=("eFG% Rank",)),
+    CategorySchema("OnOff_Team_Shooting_Frequency", prefix="OnOff_Team_", exclude=("eFG% Rank",)),
+    CategorySchema("OnOff_Team_Transition", prefix="OnOff_Team_Transition_", exclude=("Pts/Poss Rank",)),
+    CategorySchema("Shooting_Accuracy", shooting_label="Accuracy"),
+    CategorySchema("Shooting_Frequency", shooting_label="Frequency", exclude=("eFG% Rank",)),
+    CategorySchema("Shooting_Overall", shooting_label="Overall", exclude=("eFG% Rank", "FT% Rank")),
+]
+
+
+def join_key(df):
+    # one string per (Player, Team): a flat index joins much faster than a MultiIndex
+    return df['Player'] + '\x1f' + df['Team'].replace(TEAM_ALIASES)
+
+
+def read_category(dir_path, schema, phase, keys):
+    """Only the key columns and the schema's rank columns, indexed by join_key()"""
+    df = pd.read_csv(
+        Path(dir_path) / f"{schema.name}_{phase}.csv",
+        usecols=lambda c: c in keys or schema.keep(c)
+    )
+    df.index = join_key(df)
+    if not df.index.is_unique:
+        raise ValueError(f"Duplicate (Player, Team) rows in {schema.name}_{phase}.csv")
+    return df.rename(columns=lambda c: c if c in keys else schema.column_name(c))
+
+
+def merge_season(dir_path, phase="Regular_Season", schemas=CATEGORY_SCHEMAS):
+    """
+    Join every category of one season/phase on (Player, Team).
+    Players missing from a category get NaN ranks for it instead of
+    another player's row.
+    """
+    first, *rest = schemas
+    base = read_category(dir_path, first, phase, common_keys)
+    keys = base.index
+    frames = [base[common_keys], base.drop(columns=common_keys)]
+    for schema in rest:
+        df = read_category(dir_path, schema, phase, JOIN_KEYS).drop(columns=JOIN_KEYS)
+        frames.append(df.reindex(keys))
+    # a single concat builds the merged frame once instead of growing it per category
+    merged = pd.concat(frames, axis=1).reset_index(drop=True)
+    merged.columns = merged.columns.str.lower().str.replace(' ', '_')
+    return merged
+
+
+@profiled('master_csv_creator.combine_csv_files')
+def combine_csv_files(dir_path, output_file, phase="Regular_Season"):
+    master_df = merge_season(dir_path, phase)
+    count('master_csv_creator.merged_rows', len(master_df))
+    output_dir = PHASES[phase]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    master_df.to_csv(output_dir / output_file, index=False)
+    return len(master_df.columns)
+
+
+def _combine_season(season, phase):
+    dir_path = CTG_CSV_DIR / season
+    output_filename = f"merged_{season}.csv"
+    n_columns = combine_csv_files(dir_path, output_filename, phase)
+    # pool processes are reused across seasons, so hand back and reset what this one recorded
+    return f"Combined {phase} CSV for season {season} saved as {output_filename} ({n_columns} columns)", METRICS.drain()
+
+
+def season_problems(season, phase, manifest, schemas=CATEGORY_SCHEMAS):
+    """Exports of one season/phase the manifest says are missing, partial or truncated"""
+    return manifest.problems([CTG_CSV_DIR / season / f"{schema.name}_{phase}.csv" for schema in schemas])
+
+
+@profiled('master_csv_creator.combine_seasons')
+def combine_seasons(seasons=SEASONS, phases=tuple(PHASES), processes=None):
+    """
+    Merge every (season, phase) directory, each in its own worker process.
+    Every export is checked against CTG_CSV_Data/manifest.json first; a
+    season/phase with a bad file is refused rather than merged into NaN ranks.
+    Returns the refused (season, phase) pairs with their problems.
+    """
+    manifest = CTGManifest(CTG_CSV_DIR)
+    jobs, refused = [], {}
+    for season in seasons:
+        if not (CTG_CSV_DIR / season).exists():
+            print(f"Directory for season {season} does not exist. Skipping...")
+            continue
+        for phase in phases:
+            problems = season_problems(season, phase, manifest)
+            if problems:
+                refused[(season, phase)] = problems
+            else:
+                jobs.append((season, phase))
+    for (season, phase), problems in refused.items():
+        print(f"Refusing to merge {phase} {season}:")
+        for path, reason in problems.items():
+            print(f"  {path}: {reason}")
+    if jobs:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=WORKER_CONTEXT, initializer=reset_worker_metrics) as pool:
+            for message, metrics in pool.map(_combine_season, *zip(*jobs)):
+                print(message)
+                METRICS.merge(metrics)
+    return refused
+
 
 def drop_pts_per_poss_columns(df):
-    df = df.drop(columns=['Pts/Poss', 'Pts/Poss Rank']) 
+    df = df.drop(columns=['Pts/Poss', 'Pts/Poss Rank'])
     return df
 
-def combine_csv_files(dir_path, output_file):    
-    file_list = [f for f in os.listdir(dir_path) if f.endswith('_Regular_Season.csv')]
+
+def combine_csv_files_loop(dir_path, output_file=None):
+    """
+    Original merger, kept for benchmarks. Relies on every category listing its
+    players in the same order, which the on/off exports do not.
+    """
+    # sorted: the directory order this was written against
+    file_list = sorted(f for f in os.listdir(dir_path) if f.endswith('_Regular_Season.csv'))
     first_file_path = Path(dir_path) / file_list[0]
     master_df = pd.DataFrame(pd.read_csv(first_file_path))
     common_keys = ['Player', 'Team', 'Age', 'Pos', 'MIN']
@@ -54,24 +206,20 @@ def combine_csv_files(dir_path, output_file):
 
     cols_to_keep = common_keys + [col for col in master_df.columns if col.endswith('Rank')]
     master_df = master_df[cols_to_keep]
-    print(f"Total columns in master dataframe: {len(master_df.columns)}")    
     master_df.columns = master_df.columns.str.lower().str.replace(' ', '_')
-    master_df.to_csv(f"merged_csvs/{output_file}", index=False)
+    if output_file is not None:
+        print(f"Total columns in master dataframe: {len(master_df.columns)}")
+        master_df.to_csv(f"merged_csvs/{output_file}", index=False)
+    return master_df
 
 
-for year in range(2003, 2024):
-    season = f"{year}-{str(year+1)[-2:]}"
-    dir_path = Path(f"CTG_CSV_Data\\{season}")
-    if not dir_path.exists():
-        print(f"Directory for season {season} does not exist. Skipping...")
-        continue
-    output_filename = f"merged_{season}.csv"
-    combine_csv_files(dir_path, output_filename)
-    print(f"Combined CSV for season {season} saved as {output_filename}")
-# season = f"{2003}-{str(2003+1)[-2:]}"
-# dir_path = Path(f"CTG_CSV_Data\\{season}")
-# if not dir_path.exists():
-#     print(f"Directory for season {season} does not exist. Skipping...")
-# output_filename = f"merged_{season}.csv"
-# combine_csv_files(dir_path, output_filename)
-# print(f"Combined CSV for season {season} saved as {output_filename}")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the per-category CTG exports into one CSV per season")
+    parser.add_argument('--phase', choices=sorted(PHASES), action='append', help='default: every phase')
+    parser.add_argument('--season', action='append', help='e.g. 2023-24; default: every season')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per CPU)')
+    args = parser.parse_args()
+    refused = combine_seasons(args.season or SEASONS, args.phase or tuple(PHASES), args.processes)
+    write_report('master_csv_creator')
+    if refused:
+        raise SystemExit(f"{len(refused)} season/phase merge(s) refused, re-download those exports")
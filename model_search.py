@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+from llm_cache import cache_key
+from instrumentation import WORKER_CONTEXT, reset_worker_metrics
+
+MODEL_CACHE_DIR = "model_cache"
+# bump when the layout of cached values changes
+MODEL_CACHE_VERSION = 2
+
+# Same grid the old LogisticRegressionCV searched
+SEARCH_PARAMS = {
+    "l1_ratios": np.linspace(0.1, 0.9, 9).tolist(),
+    "Cs": np.logspace(-2, 2, 10).tolist(),
+    "inner_cv": 5,
+    "max_iter": 20000,
+    "random_state": 42,
+}
+
+
+class FoldModelCache:
+    """
+    Fitted models on disk, one joblib file per key. Keys come from
+    model_key(), so a model is only reused for identical data and params.
+    """
+
+    def __init__(self, cache_dir: str = MODEL_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return joblib.load(path)
+
+    def put(self, key, value):
+        # parallel workers may race on the same key; os.replace keeps every reader whole
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp_", suffix=".joblib")
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+        try:
+            joblib.dump(value, tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def data_hash(X, y) -> str:
+    return joblib.hash((np.ascontiguousarray(X), np.ascontiguousarray(y)))
+
+
+def model_key(X, y, **params) -> str:
+    return cache_key(data_hash(X, y), json.dumps(dict(params, version=MODEL_CACHE_VERSION), sort_keys=True))
+
+
+def elastic_net_path(X, y, l1_ratio, params):
+    """
+    Coefficients for every C at one l1_ratio. Cs run from strongest to weakest
+    penalty and each fit starts from the previous solution, so later fits only
+    need a few saga epochs.
+    """
+    clf = LogisticRegression(
+        penalty='elasticnet',
+        solver='saga',
+        l1_ratio=l1_ratio,
+        max_iter=params["max_iter"],
+        random_state=params["random_state"],
+        warm_start=True,
+    )
+    coefs, intercepts = [], []
+    for C in sorted(params["Cs"]):
+        clf.set_params(C=C)
+        clf.fit(X, y)
+        coefs.append(clf.coef_[0].copy())
+        intercepts.append(clf.intercept_[0])
+    return np.array(coefs), np.array(intercepts)
+
+
+def cached_path(cache, X, y, l1_ratio, params):
+    """(coefs, intercepts, seconds the fit took), the timing kept so cached runs still report fit cost"""
+    key = model_key(X, y, stage="path", l1_ratio=l1_ratio, **params)
+    path = cache.get(key)
+    if path is None:
+        start = time.perf_counter()
+        coefs, intercepts = elastic_net_path(X, y, l1_ratio, params)
+        path = (coefs, intercepts, time.perf_counter() - start)
+        cache.put(key, path)
+    return path
+
+
+def search_elastic_net(X, y, params, cache):
+    """
+    Stand-in for LogisticRegressionCV(scoring='roc_auc'): inner stratified folds
+    pick (l1_ratio, C) by mean validation AUC, then the winner is refit on all of
+    X, warm started from the fold-averaged coefficients.
+    best["fit_seconds"] is the solver time behind the result, cached or not.
+    """
+    Cs = sorted(params["Cs"])
+    l1_ratios = params["l1_ratios"]
+    inner = StratifiedKFold(n_splits=params["inner_cv"])
+    scores = np.zeros((len(l1_ratios), len(Cs), params["inner_cv"]))
+    fold_coefs = np.zeros((len(l1_ratios), len(Cs), params["inner_cv"], X.shape[1]))
+    fold_intercepts = np.zeros((len(l1_ratios), len(Cs), params["inner_cv"]))
+    fit_seconds = 0.0
+
+    for fold, (train, val) in enumerate(inner.split(X, y)):
+        for i, l1_ratio in enumerate(l1_ratios):
+            coefs, intercepts, seconds = cached_path(cache, X[train], y[train], l1_ratio, params)
+            fit_seconds += seconds
+            decision = X[val] @ coefs.T + intercepts
+            scores[i, :, fold] = [roc_auc_score(y[val], decision[:, j]) for j in range(len(Cs))]
+            fold_coefs[i, :, fold] = coefs
+            fold_intercepts[i, :, fold] = intercepts
+
+    mean_scores = scores.mean(axis=2)
+    i, j = np.unravel_index(np.argmax(mean_scores), mean_scores.shape)
+    best = {"l1_ratio": l1_ratios[i], "C": Cs[j], "inner_auc": mean_scores[i, j]}
+
+    key = model_key(X, y, stage="refit", **params)
+    refit = cache.get(key)
+    if refit is None:
+        start = time.perf_counter()
+        clf = LogisticRegression(
+            penalty='elasticnet',
+            solver='saga',
+            C=best["C"],
+            l1_ratio=best["l1_ratio"],
+            max_iter=params["max_iter"],
+            random_state=params["random_state"],
+            warm_start=True,
+        )
+        clf.coef_ = fold_coefs[i, j].mean(axis=0)[np.newaxis, :]
+        clf.intercept_ = np.array([fold_intercepts[i, j].mean()])
+        clf.fit(X, y)
+        refit = (clf, time.perf_counter() - start)
+        cache.put(key, refit)
+    clf, seconds = refit
+    best["fit_seconds"] = fit_seconds + seconds
+    return clf, best
+
+
+def fit_fold(X, y, train, test, params, cache_dir=MODEL_CACHE_DIR):
+    """
+    One unit of work for the pool: scale, search and refit on X[train], then
+    score on X[test] (test=None for the final all-data model). BLAS is pinned to
+    one thread so a full pool never oversubscribes the machine.
+    """
+    start = time.perf_counter()
+    cache = FoldModelCache(cache_dir)
+    with threadpool_limits(limits=1):
+        scaler = StandardScaler().fit(X[train])
+        clf, best = search_elastic_net(scaler.transform(X[train]), y[train], params, cache)
+        model = Pipeline([('scaler', scaler), ('clf', clf)])
+        score = None if test is None else roc_auc_score(y[test], model.decision_function(X[test]))
+    return {
+        "model": model,
+        "score": score,
+        "best": best,
+        "seconds": time.perf_counter() - start,
+        "fit_seconds": best["fit_seconds"],
+        "cache_hits": cache.hits,
+        "cache_misses": cache.misses,
+    }
+
+
+def run_fold_jobs(jobs: dict, params=SEARCH_PARAMS, max_workers=None, cache_dir=MODEL_CACHE_DIR) -> dict:
+    """
+    jobs maps a label to (X, y, train, test); every job runs fit_fold with a
+    single thread, either inline (max_workers=1) or in a process pool.
+    """
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+    if max_workers <= 1:
+        return {label: fit_fold(*job, params, cache_dir) for label, job in jobs.items()}
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=WORKER_CONTEXT, initializer=reset_worker_metrics) as pool:
+        futures = {pool.submit(fit_fold, *job, params, cache_dir): label for label, job in jobs.items()}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return {label: results[label] for label in jobs}
+
+
+class StageTimer:
+    """Wall-clock seconds per named stage, in the order the stages first ran"""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def report(self) -> str:
+        width = max(map(len, self.seconds), default=0)
+        lines = [f"{name:<{width}}  {seconds:8.2f}s" for name, seconds in self.seconds.items()]
+        return "\n".join(lines)
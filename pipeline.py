@@ -0,0 +1,233 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import traceback
+from typing import Callable, NamedTuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from model_search import StageTimer
+from instrumentation import timed, write_report
+from stats_backend import DEFAULT_DB_PATHS, DEFAULT_STATS_BACKEND
+
+PIPELINE_STATE = "pipeline_state.json"
+# the stats chain and trade parsing are the two independent branches
+PIPELINE_WORKERS = 2
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable              # run(upstream) -> result; upstream maps the stages that ran this time to their results
+    inputs: tuple              # glob patterns, code included, hashed to decide whether the stage is stale; () = always run
+    outputs: tuple             # glob patterns that must all match for the stage to be skipped
+    deps: tuple = ()
+    default: bool = True       # False: only runs when named on the command line
+
+
+# Stage bodies import their module lazily, so e.g. the stats chain still runs without ollama installed
+
+def run_download(upstream):
+    from ctg_http import fetch_all
+    return fetch_all()
+
+
+def run_merge(upstream):
+    from master_csv_creator import combine_seasons
+    # refused season/phases keep their previous merged CSV; python ctg_data.py --check lists why
+    return combine_seasons()
+
+
+def run_load(upstream):
+    from master_csv_creator import MERGED_CSV_DIR
+    from sql_processor import update_seasons_in_db
+    return update_seasons_in_db(MERGED_CSV_DIR)
+
+
+def run_aggregate(upstream):
+    from sql_processor import aggregate_to_team_level, label_df
+    # just the (phase, season)s load reloaded; everything when load was skipped or did a full rebuild
+    team_df = aggregate_to_team_level(phase_seasons=upstream.get('load') or None)
+    label_df(team_df)
+
+
+def run_regression(upstream):
+    import regression
+    regression.main()
+
+
+def run_trades(upstream):
+    from trade_graph_builder import parse_trade_htmls
+    parse_trade_htmls()
+
+
+# in dependency order
+STAGES = {stage.name: stage for stage in (
+    # its input is the website, so it runs whenever selected; fetch_all itself skips exports it already has
+    Stage('download', run_download,
+          inputs=(),
+          outputs=('CTG_CSV_Data/manifest.json',),
+          default=False),
+    Stage('merge', run_merge,
+          inputs=('master_csv_creator.py', 'ctg_data.py', 'CTG_CSV_Data/manifest.json', 'CTG_CSV_Data/*/*.csv'),
+          outputs=('merged_csvs/merged_*.csv', 'merged_csvs/playoffs/merged_*.csv'),
+          deps=('download',)),
+    Stage('load', run_load,
+          inputs=('sql_processor.py', 'stats_backend.py', 'player_query.py',
+                  'merged_csvs/merged_*.csv', 'merged_csvs/playoffs/merged_*.csv'),
+          outputs=('all_player_season_stats.csv', DEFAULT_DB_PATHS[DEFAULT_STATS_BACKEND]),
+          deps=('merge',)),
+    Stage('aggregate', run_aggregate,
+          inputs=('sql_processor.py', 'stats_backend.py', 'all_player_season_stats.csv',
+                  'playoff_teams.json', 'conf_finals_teams.json'),
+          outputs=('team_aggregated_stats.csv', 'team_aggregated_stats_labeled.csv'),
+          deps=('load',)),
+    Stage('regression', run_regression,
+          inputs=('regression.py', 'model_search.py', 'importance.py', 'feature_screen.py',
+                  'team_aggregated_stats_labeled.csv'),
+          outputs=('perm_importance_*.csv', 'feature_importance_elastic_net_*.csv'),
+          deps=('aggregate',)),
+    Stage('trades', run_trades,
+          inputs=('trade_graph_builder.py', 'trade_store.py', 'llm_cache.py', 'bbref_htmls/*.html'),
+          outputs=('trades.arrow',)),
+)}
+
+
+def with_dependencies(names, stages=STAGES):
+    """The named stages plus their dependencies, in run order; non-default dependencies only when named"""
+    unknown = [name for name in names if name not in stages]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown}, expected one of {list(stages)}")
+    selected = set()
+    todo = list(names)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(dep for dep in stages[name].deps if stages[dep].default or dep in names)
+    return [name for name in stages if name in selected]
+
+
+def load_state(path=PIPELINE_STATE):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'files': {}, 'stages': {}}
+
+
+def save_state(state, path=PIPELINE_STATE):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp_", suffix=".json")
+    os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def file_sha256(path, known):
+    stat = os.stat(path)
+    previous = known.get(path)
+    # unchanged size + mtime means the file was not rewritten, skip hashing it
+    if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+        return previous['sha256']
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    known[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha.hexdigest()}
+    return known[path]['sha256']
+
+
+def inputs_digest(stage, known):
+    """One hash over the path and content of every file the stage's input patterns match"""
+    digest = hashlib.sha256()
+    for path in sorted({path for pattern in stage.inputs for path in glob.glob(pattern)}):
+        digest.update(f"{path}\0{file_sha256(path, known)}\0".encode())
+    return digest.hexdigest()
+
+
+def outputs_exist(stage):
+    return all(glob.glob(pattern) for pattern in stage.outputs)
+
+
+def run_pipeline(targets=None, force=(), workers=PIPELINE_WORKERS, state_path=PIPELINE_STATE):
+    """
+    Run the selected stages and everything they depend on. A stage whose
+    input hash matches the last successful run and whose outputs exist is
+    skipped; independent stages run side by side. A failed stage blocks its
+    dependents but not the other branches. Returns {stage: status}.
+    """
+    names = with_dependencies(targets or [name for name, stage in STAGES.items() if stage.default])
+    force = set(names) if force == 'all' else set(force)
+    state = load_state(state_path)
+    timer = StageTimer()
+    status, results, digests, running = {}, {}, {}, {}
+
+    def timed_run(stage, upstream):
+        with timer.stage(stage.name), timed(f'pipeline.{stage.name}'):
+            return stage.run(upstream)
+
+    start = time.perf_counter()
+    pending = list(names)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                stage = STAGES[name]
+                dep_status = [status.get(dep) for dep in stage.deps if dep in names]
+                if None in dep_status:
+                    continue
+                pending.remove(name)
+                if 'failed' in dep_status or 'blocked' in dep_status:
+                    status[name] = 'blocked'
+                    continue
+                digests[name] = inputs_digest(stage, state['files'])
+                unchanged = stage.inputs and state['stages'].get(name) == digests[name]
+                if name not in force and unchanged and outputs_exist(stage):
+                    status[name] = 'skipped'
+                    print(f"[pipeline] {name}: inputs unchanged, skipping")
+                    continue
+                print(f"[pipeline] {name}: running")
+                running[pool.submit(timed_run, stage, dict(results))] = name
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception:
+                    status[name] = 'failed'
+                    print(f"[pipeline] {name} failed:")
+                    traceback.print_exc()
+                    continue
+                status[name] = 'ran'
+                state['stages'][name] = digests[name]
+                save_state(state, state_path)
+    save_state(state, state_path)
+
+    print(f"\nPipeline summary ({time.perf_counter() - start:.2f}s wall clock)")
+    width = max(map(len, names))
+    for name in names:
+        seconds = timer.seconds.get(name)
+        print(f"  {name:<{width}}  {status[name]:<8}" + (f"  {seconds:8.2f}s" if seconds is not None else ""))
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the data and model stages, skipping those whose inputs did not change")
+    parser.add_argument('stages', nargs='*', metavar='STAGE',
+                        help=f"stages to bring up to date, with their dependencies (default: every stage but download); one of {', '.join(STAGES)}")
+    parser.add_argument('--force', nargs='+', default=(), metavar='STAGE', help='run these stages even if their inputs are unchanged')
+    parser.add_argument('--force-all', action='store_true', help='run every selected stage')
+    parser.add_argument('--workers', type=int, default=PIPELINE_WORKERS, help='stages that may run at the same time')
+    parser.add_argument('--state', default=PIPELINE_STATE, help='where input hashes of the last successful runs are kept')
+    args = parser.parse_args()
+    status = run_pipeline(args.stages, 'all' if args.force_all else args.force, args.workers, args.state)
+    write_report('pipeline')
+    if 'failed' in status.values():
+        raise SystemExit(1)
@@ -0,0 +1,142 @@
+from stats_backend import STATS_BACKENDS, get_backend, quote
+
+AGGREGATES = ("sum", "max", "weighted")
+
+
+class PlayerQuery:
+    """
+    Lazy query over player_season_stats. where()/select() only record filters
+    and columns; the database (SQLite or DuckDB, see stats_backend.py) does
+    the filtering, projection and GROUP BY when fetch(), chunks() or
+    aggregate() runs.
+
+        PlayerQuery('nba_stats.db').where(team='BOS', season='2023-24', phase='Playoffs').select('min', 'usage_rank').fetch()
+    """
+
+    def __init__(self, db, table='player_season_stats', columns=None, filters=None, backend=None):
+        self.db = db
+        self.backend = backend or get_backend(db_path=db if isinstance(db, str) else None)
+        self.table = table
+        self.columns = columns
+        self.filters = filters or {}
+        self._known_columns = None
+
+    def _connect(self):
+        return self.backend.connect() if isinstance(self.db, str) else self.db
+
+    def _close(self, conn):
+        if conn is not self.db:
+            conn.close()
+
+    def table_columns(self):
+        if self._known_columns is None:
+            conn = self._connect()
+            try:
+                self._known_columns = self.backend.table_columns(conn, self.table)
+            finally:
+                self._close(conn)
+        return self._known_columns
+
+    def _check(self, columns):
+        unknown = [c for c in columns if c not in self.table_columns()]
+        if unknown:
+            raise KeyError(f"Unknown column(s) in {self.table}: {unknown}")
+
+    def _copy(self, **changes):
+        query = PlayerQuery(self.db, self.table, self.columns, dict(self.filters), self.backend)
+        query._known_columns = self._known_columns
+        for name, value in changes.items():
+            setattr(query, name, value)
+        return query
+
+    def where(self, **filters):
+        """Equality filters; a list or tuple value becomes IN (...). e.g. where(season=['2022-23', '2023-24'])"""
+        self._check(filters)
+        return self._copy(filters={**self.filters, **filters})
+
+    def select(self, *columns):
+        self._check(columns)
+        return self._copy(columns=list(columns))
+
+    def _where_sql(self):
+        clauses, params = [], []
+        for column, value in self.filters.items():
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{quote(column)} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{quote(column)} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def to_sql(self):
+        select = ", ".join(map(quote, self.columns)) if self.columns else "*"
+        where, params = self._where_sql()
+        # file order, the same order PLAYER_ORDER_QUERY gives
+        return f"SELECT {select} FROM {quote(self.table)}{where} ORDER BY phase DESC, season, rowid", params
+
+    def fetch(self):
+        sql, params = self.to_sql()
+        conn = self._connect()
+        try:
+            return self.backend.read_query(conn, sql, params)
+        finally:
+            self._close(conn)
+
+    def chunks(self, chunksize=2000):
+        """Stream the result as DataFrames of at most chunksize rows"""
+        sql, params = self.to_sql()
+        conn = self._connect()
+        try:
+            yield from self.backend.read_chunks(conn, sql, params, chunksize)
+        finally:
+            self._close(conn)
+
+    def aggregate(self, columns, how=AGGREGATES, by=('team', 'season'), minutes='min'):
+        """
+        One row per group with <col>_sum, <col>_max and <col>_weighted
+        (minutes-weighted mean: SUM(col * min) / SUM(min), where players
+        without a value still count towards the minutes) computed in the database.
+        """
+        by, columns = list(by), list(columns)
+        self._check(by + columns + [minutes])
+        unknown = set(how) - set(AGGREGATES)
+        if unknown:
+            raise ValueError(f"Unknown aggregate(s): {sorted(unknown)}")
+        exprs = [quote(c) for c in by]
+        for column in columns:
+            col = quote(column)
+            if "sum" in how:
+                exprs.append(f"SUM({col}) AS {quote(column + '_sum')}")
+            if "max" in how:
+                exprs.append(f"MAX({col}) AS {quote(column + '_max')}")
+            if "weighted" in how:
+                exprs.append(f"SUM({col} * {quote(minutes)}) * 1.0 / SUM({quote(minutes)}) AS {quote(column + '_weighted')}")
+        where, params = self._where_sql()
+        group = ", ".join(quote(c) for c in by)
+        sql = f"SELECT {', '.join(exprs)} FROM {quote(self.table)}{where} GROUP BY {group} ORDER BY {group}"
+        conn = self._connect()
+        try:
+            return self.backend.read_query(conn, sql, params)
+        finally:
+            self._close(conn)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Scouting lookup: one team-season's players straight from the stats database")
+    parser.add_argument('team', help='e.g. BOS')
+    parser.add_argument('season', help='e.g. 2023-24')
+    parser.add_argument('--phase', choices=['Regular_Season', 'Playoffs'], default='Regular_Season')
+    parser.add_argument('--backend', choices=sorted(STATS_BACKENDS), default=None, help='default: $STATS_BACKEND or sqlite')
+    parser.add_argument('--db', default=None, help="default: the backend's database file")
+    parser.add_argument('--columns', nargs='+', default=['player', 'pos', 'min', 'usage_rank'])
+    parser.add_argument('--aggregate', nargs='+', metavar='COLUMN', help='print team SUM/MAX/minutes-weighted rows for these columns instead')
+    args = parser.parse_args()
+    backend = get_backend(args.backend, args.db)
+    query = PlayerQuery(backend.db_path, backend=backend).where(team=args.team, season=args.season, phase=args.phase)
+    if args.aggregate:
+        print(query.aggregate(args.aggregate).T.to_string(header=False))
+    else:
+        print(query.select(*args.columns).fetch().to_string(index=False))
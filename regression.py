@@ -1,29 +1,33 @@
-from sklearn.linear_model import LogisticRegressionCV
-from sklearn.model_selection import StratifiedGroupKFold, cross_validate
-from sklearn.metrics import roc_auc_score, classification_report
-from sklearn.preprocessing import StandardScaler
-from sklearn.pipeline import Pipeline
+import argparse
+from sklearn.model_selection import StratifiedGroupKFold
 from sklearn.inspection import permutation_importance
 import numpy as np
 import pandas as pd
+from feature_store import feature_columns, read_features
+from model_search import MODEL_CACHE_DIR, SEARCH_PARAMS, FoldModelCache, StageTimer, run_fold_jobs
+from importance import feature_groups, grouped_permutation_importance
+from feature_screen import SCREEN_MODES, screen_features
+from instrumentation import timed, count, observe, profiled, write_report
 
 # ------------------------------------------------------------
-# Two different labeled datasets
-#   • pretenders_stats_labeled.csv   (has `playoffs` column)
-#   • contenders_stats_labeled.csv   (has `conf_finals` column)
+# One labeled table (feature store, see feature_store.py)
+#   • team_aggregated_stats_labeled   (has `playoffs` and `conf_finals` columns)
+# load_dataset only projects the target it is asked for, so the
+# other label never ends up among the features
 # ------------------------------------------------------------
 datasets = {
-    "playoffs": ("pretenders_stats_labeled.csv", "playoffs"),
-    "conf_finals": ("contenders_stats_labeled.csv", "conf_finals")
+    "playoffs": ("team_aggregated_stats_labeled", "playoffs"),
+    "conf_finals": ("team_aggregated_stats_labeled", "conf_finals")
 }
+AGGREGATE_SUFFIXES = ('_highest', '_top2_avg', '_weighted')
 
-for label_name, (filename, target_col) in datasets.items():
-    print("\n" + "="*60)
-    print(f"Running model for: {label_name.upper()}")
-    print("="*60)
 
-    # Load per-target dataset
-    df = pd.read_csv(filename)
+def load_dataset(filename, target_col, phase='Regular_Season'):
+    # Load per-target dataset, projecting only keys, aggregated features and the target
+    columns = [c for c in feature_columns(filename) if c in ('Team', 'Season', 'Phase', target_col) or c.endswith(AGGREGATE_SUFFIXES)]
+    df = read_features(filename, columns=columns)
+    # playoff rows sit next to the regular season ones; the models predict from the regular season
+    df = df[df['Phase'] == phase].drop(columns='Phase')
     df = df[~((df['Team'] == 'CHA') & (df['Season'] == '2003-04'))]
 
     # -----------------------------
@@ -34,82 +38,178 @@ for label_name, (filename, target_col) in datasets.items():
     X = df.drop(columns=drop_cols + [target_col])
     y = df[target_col]
     groups = df['Season']
+    return X, y, groups
 
-    # -----------------------------
-    # Define pipeline
-    # -----------------------------
-    pipeline = Pipeline([
-        ('scaler', StandardScaler()),
-        ('clf', LogisticRegressionCV(
-            penalty='elasticnet',
-            solver='saga',
-            l1_ratios=np.linspace(0.1, 0.9, 9),
-            Cs=np.logspace(-2, 2, 10),
-            cv=5,
-            scoring='roc_auc',
-            max_iter=20000,
-            n_jobs=-1,
-            random_state=42
-        ))
-    ])
-
-    # Season-aware CV
-    cv = StratifiedGroupKFold(n_splits=5)
-    cv_results = cross_validate(
-        pipeline, X, y, groups=groups,
-        cv=cv, scoring='roc_auc',
-        return_estimator=True
-    )
-
-    print(f"Mean ROC AUC ({label_name}): {cv_results['test_score'].mean():.4f}")
-
-    # Fit final model
-    pipeline.fit(X, y)
+
+@profiled('regression.main')
+def main(max_workers=None, cache_dir=MODEL_CACHE_DIR, importance='sklearn', screen=None, screen_threshold=0.8,
+         search_params=SEARCH_PARAMS):
+    timer = StageTimer()
+
+    with timer.stage("load datasets"):
+        data = {label_name: load_dataset(filename, target_col) for label_name, (filename, target_col) in datasets.items()}
 
     # -----------------------------
-    # Permutation Importance
+    # Correlation screening (see feature_screen.py)
     # -----------------------------
-    result = permutation_importance(
-        pipeline, X, y,
-        n_repeats=10,
-        random_state=42,
-        n_jobs=-1,
-        scoring='roc_auc'
-    )
-
-    perm_importance_df = pd.DataFrame({
-        'feature': X.columns,
-        'importance_mean': result.importances_mean,
-        'importance_std': result.importances_std
-    }).sort_values('importance_mean', ascending=False)
-
-    perm_importance_df.to_csv(
-        f'perm_importance_{label_name}.csv',
-        index=False
-    )
+    # The full matrix is always searched too, so the report below can show
+    # what screening costs in AUC; its folds come straight from the cache
+    # after the first run
+    features = {(label_name, 'full'): X for label_name, (X, y, groups) in data.items()}
+    if screen:
+        with timer.stage("feature screening"):
+            cache = FoldModelCache(cache_dir)
+            for label_name, (X, y, groups) in data.items():
+                kept = screen_features(X.to_numpy(), X.columns, screen, screen_threshold, AGGREGATE_SUFFIXES, cache)
+                features[(label_name, 'screened')] = X[kept]
+    model_variant = 'screened' if screen else 'full'
 
     # -----------------------------
-    # Coefficient-Based Importance
+    # Elastic-net search (see model_search.py)
     # -----------------------------
-    final_model = pipeline.named_steps['clf']
-
-    coefs = pd.DataFrame({
-        'feature': X.columns,
-        'coefficient': final_model.coef_[0],
-        'abs_coefficient': np.abs(final_model.coef_[0])
-    }).sort_values('abs_coefficient', ascending=False)
-
-    coefs.to_csv(
-        f'feature_importance_elastic_net_{label_name}.csv',
-        index=False
-    )
-
-    print("\nTOP 10 POSITIVE FEATURES")
-    print(coefs.sort_values('coefficient', ascending=False)
-              .head(10)[['feature', 'coefficient']]
-              .to_string(index=False))
-
-    print("\nTOP 10 NEGATIVE FEATURES")
-    print(coefs.sort_values('coefficient', ascending=True)
-              .head(10)[['feature', 'coefficient']]
-              .to_string(index=False))
+    # Season-aware outer CV; every outer fold and the final all-data fit of
+    # both targets is an independent job for the process pool
+    jobs = {}
+    for (label_name, variant), X in features.items():
+        X_values, y_values = X.to_numpy(), data[label_name][1].to_numpy()
+        groups = data[label_name][2]
+        cv = StratifiedGroupKFold(n_splits=5)
+        for fold, (train, test) in enumerate(cv.split(X_values, y_values, groups)):
+            jobs[(label_name, variant, fold)] = (X_values, y_values, train, test)
+        jobs[(label_name, variant, 'final')] = (X_values, y_values, np.arange(len(y_values)), None)
+
+    with timer.stage("search (wall)"), timed('regression.search'):
+        results = run_fold_jobs(jobs, search_params, max_workers, cache_dir)
+    for (label_name, variant, fold), result in results.items():
+        stage = "final fit" if fold == 'final' else "outer folds"
+        name = label_name if not screen else f"{label_name} {variant}"
+        timer.add(f"  {name} {stage} (cpu)", result["seconds"])
+        # the fits ran in pool workers; their timings come back with the results
+        observe(f'regression.fold_seconds.{label_name}.{variant}', result["seconds"])
+        observe(f'regression.fit_seconds.{label_name}.{variant}', result["fit_seconds"])
+        count('regression.model_cache_hits', result["cache_hits"])
+        count('regression.model_cache_misses', result["cache_misses"])
+    cache_hits = sum(r["cache_hits"] for r in results.values())
+    cache_misses = sum(r["cache_misses"] for r in results.values())
+
+    def fold_scores(label_name, variant):
+        return np.array([r["score"] for (name, v, fold), r in results.items()
+                         if name == label_name and v == variant and fold != 'final'])
+
+    def fit_seconds(label_name, variant):
+        return sum(r["fit_seconds"] for (name, v, fold), r in results.items() if name == label_name and v == variant)
+
+    for label_name, (_, y, groups) in data.items():
+        X = features[(label_name, model_variant)]
+        print("\n" + "="*60)
+        print(f"Running model for: {label_name.upper()}")
+        print("="*60)
+
+        print(f"Mean ROC AUC ({label_name}): {fold_scores(label_name, model_variant).mean():.4f}")
+
+        # Final model, fit on all the data
+        final = results[(label_name, model_variant, 'final')]
+        pipeline = final["model"]
+        print(f"Selected l1_ratio={final['best']['l1_ratio']:.2f}, C={final['best']['C']:.4g}")
+
+        # -----------------------------
+        # Permutation Importance
+        # -----------------------------
+        with timer.stage(f"permutation importance ({label_name})"), timed(f'regression.permutation_importance.{label_name}'):
+            if importance == 'sklearn':
+                # the pool has shut down by now, so n_jobs=-1 has the machine to itself
+                result = permutation_importance(
+                    pipeline, X.to_numpy(), y.to_numpy(),
+                    n_repeats=10,
+                    random_state=42,
+                    n_jobs=-1,
+                    scoring='roc_auc'
+                )
+                importance_names = X.columns
+                importances_mean, importances_std = result.importances_mean, result.importances_std
+            else:
+                # the three aggregations of a stat are permuted together, so
+                # there is one row per stat rather than per column
+                groups = feature_groups(X.columns, AGGREGATE_SUFFIXES)
+                group_importance = grouped_permutation_importance(
+                    pipeline, X.to_numpy(), y.to_numpy(), groups,
+                    n_repeats=10,
+                    random_state=42
+                )
+                importance_names = list(group_importance)
+                importances_mean = [group_importance[stat][0] for stat in importance_names]
+                importances_std = [group_importance[stat][1] for stat in importance_names]
+
+        perm_importance_df = pd.DataFrame({
+            'feature': importance_names,
+            'importance_mean': importances_mean,
+            'importance_std': importances_std
+        }).sort_values('importance_mean', ascending=False)
+
+        perm_importance_df.to_csv(
+            f'perm_importance_{label_name}.csv',
+            index=False
+        )
+
+        # -----------------------------
+        # Coefficient-Based Importance
+        # -----------------------------
+        final_model = pipeline.named_steps['clf']
+
+        coefs = pd.DataFrame({
+            'feature': X.columns,
+            'coefficient': final_model.coef_[0],
+            'abs_coefficient': np.abs(final_model.coef_[0])
+        }).sort_values('abs_coefficient', ascending=False)
+
+        coefs.to_csv(
+            f'feature_importance_elastic_net_{label_name}.csv',
+            index=False
+        )
+
+        print("\nTOP 10 POSITIVE FEATURES")
+        print(coefs.sort_values('coefficient', ascending=False)
+                  .head(10)[['feature', 'coefficient']]
+                  .to_string(index=False))
+
+        print("\nTOP 10 NEGATIVE FEATURES")
+        print(coefs.sort_values('coefficient', ascending=True)
+                  .head(10)[['feature', 'coefficient']]
+                  .to_string(index=False))
+
+    print("\n" + "="*60)
+    print("TIMING")
+    print("="*60)
+    print(timer.report())
+    print(f"Fold model cache: {cache_hits} hits, {cache_misses} misses ({cache_dir}/)")
+
+    if screen:
+        # fit seconds are solver time recorded when each model was first fit,
+        # so they stay comparable when the folds come from the cache
+        print("\n" + "="*60)
+        print(f"SCREENING ({screen}, |rho| >= {screen_threshold})")
+        print("="*60)
+        for label_name in data:
+            full_auc = fold_scores(label_name, 'full').mean()
+            screened_auc = fold_scores(label_name, 'screened').mean()
+            full_fit = fit_seconds(label_name, 'full')
+            screened_fit = fit_seconds(label_name, 'screened')
+            print(f"{label_name}: {features[(label_name, 'full')].shape[1]} -> "
+                  f"{features[(label_name, 'screened')].shape[1]} columns, "
+                  f"fit {full_fit:.1f}s -> {screened_fit:.1f}s ({(screened_fit - full_fit) / full_fit:+.1%}), "
+                  f"ROC AUC {full_auc:.4f} -> {screened_auc:.4f} ({screened_auc - full_auc:+.4f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=None, help='processes for the outer folds (default: one per CPU)')
+    parser.add_argument('--cache-dir', default=MODEL_CACHE_DIR, help='where fitted fold models are cached')
+    parser.add_argument('--importance', choices=['sklearn', 'grouped'], default='sklearn',
+                        help='sklearn: per-column permutation_importance; grouped: permute the aggregations of each stat together '
+                             '(fast), one row per stat')
+    parser.add_argument('--screen', choices=SCREEN_MODES, default=None,
+                        help='keep one feature per correlation cluster or per stat group, and report the effect')
+    parser.add_argument('--screen-threshold', type=float, default=0.8, help='|Spearman rho| that joins a cluster')
+    args = parser.parse_args()
+    main(args.workers, args.cache_dir, args.importance, args.screen, args.screen_threshold)
+    write_report('regression')
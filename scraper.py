@@ -1,104 +1,203 @@
 import os
-import glob
 import time
+import queue
+import shutil
+import threading
+from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 import json
 from selenium.webdriver.chrome.service import Service
 import pandas as pd
+from ctg_data import CTG_URL, CTG_CSV_DIR, CTG_SEASON_PHASES, CTG_YEARS, CTG_CATEGORIES, CTGManifest, season_label, ctg_path
 
 no_data_mapping = {}
-     
-def get_last_filename_and_rename(save_folder, year, new_filename, selected_season_phase):
-    files = glob.glob(save_folder +  '/*.csv')
-    if not files:
-        return None  
-    max_file = max(files, key=os.path.getctime)
-    filename = max_file.split("/")[-1].split(".")[0] 
-    new_path = os.path.join(save_folder, f"{str(year)}-{str(year + 1)[2:4]}\\{new_filename}_{selected_season_phase.replace(" ", "_")}.csv")
-    os.rename(max_file, new_path)  
-    return new_path
-
-def download_by_year(driver, year, selected_season_phase="Regular Season", url="https://cleaningtheglass.com/stats/players"):    
-    download_folder = os.getcwd() + f"\\CTG_CSV_Data"
-
-    categories = {
-        "Offensive Overview": "offensive_overview",
-        "Shooting Overall": "shooting_overall",
-        "Shooting Frequency": "shooting_frequency",
-        "Shooting Accuracy": "shooting_accuracy",
-        "Defense and Rebounding": "defense_rebounding",
-        "Foul Drawing": "foul_drawing",
-        "OnOff Efficiency and Four Factors": "onoff_efficiency",
-        "OnOff Team Shooting Frequency": "onoff_team_shooting_frequency",
-        "OnOff Team Shooting Accuracy": "onoff_team_shooting_accuracy",
-        "OnOff Team Halfcourt & Putbacks": "onoff_team_halfcourt_putbacks",
-        "OnOff Team Transition": "onoff_team_transition",
-        "OnOff Opponent Shooting Frequency": "onoff_opponent_shooting_frequency",
-        "OnOff Opponent Shooting Accuracy": "onoff_opponent_shooting_accuracy",
-        "OnOff Opponent Halfcourt & Putbacks": "onoff_opponent_halfcourt_putbacks",
-        "OnOff Opponent Transition": "onoff_opponent_transition"
-    }
 
-    no_data_categories = []
+DOWNLOAD_SESSIONS = 3
+DOWNLOAD_BUTTON_XPATH = "//a[@class='download_button']"
+# What the stats page shows in place of the table when a season/phase has no data for a category.
+# Assumed from the page's wording (any leaf element saying "no data", any case); it is the only
+# thing that gets an export marked empty, so check it against such a category on the live site
+NO_DATA_XPATH = "//*[not(*)][contains(translate(text(), 'NODAT', 'nodat'), 'no data')]"
 
-    for category_name, category_slug in categories.items():
-        print(f"{category_name.replace(" ", "_")}_{selected_season_phase.replace(" ", "_")}.csv")
-        if f"{category_name.replace(" ", "_")}_{selected_season_phase.replace(" ", "_")}.csv" in os.listdir(f"{download_folder}/{str(year)}-{str(year + 1)[2:4]}"):
-            print(f"File for {category_name} already exists. Skipping download.")
-            continue
-        else:
-            category_url = f"{url}?season={year}&stat_category={category_slug}"
-            driver.get(category_url)
-            try:
-                dropdowns = driver.find_elements(By.CSS_SELECTOR, "div.year_nav__selector")
-                season_type_select = Select(dropdowns[1].find_element(By.TAG_NAME, "select"))
-                current_option = season_type_select.first_selected_option.text
-                if current_option != selected_season_phase:
-                    season_type_select.select_by_visible_text(selected_season_phase)
-                    time.sleep(2)  # Wait for the page to update
-                downloadButton = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//a[@class='download_button']"))
-                )
-                downloadButton.click()
-                time.sleep(5) 
-                downloaded_file = get_last_filename_and_rename(download_folder, year, f"{category_name.replace(' ', '_')}", selected_season_phase.replace(' ', '_'))
-                if downloaded_file:
-                    print(f"Renamed file: {downloaded_file}")
-                else:
-                    print(f"No file found for {category_name}.")
-            
-            except Exception as e:
-                print(f"Error downloading {category_name}: {e}")
-                no_data_categories.append(category_slug)
-                continue
-
-    if len(no_data_categories) > 0:
-        no_data_mapping[f"{year}_{selected_season_phase.replace(' ', '_')}"] = no_data_categories
 
-def get_ctg_data(url):
-    download_folder = os.getcwd() + "\\CTG_CSV_Data"
+def make_download_driver(download_dir):
+    """Chrome that saves straight into download_dir without asking"""
     prefs = {
-        "download.default_directory": download_folder,
+        "download.default_directory": str(Path(download_dir).resolve()),
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True
     }
-
     options = webdriver.ChromeOptions()
     options.add_experimental_option("prefs", prefs)
+    return webdriver.Chrome(options=options)
+
+
+def wait_for_download(download_dir, timeout=60, poll=0.2):
+    """
+    Path of the finished CSV in download_dir, or None after timeout.
+    Chrome writes <name>.crdownload and renames it when done, so a .csv with
+    no partial file beside it and a size that held still for one poll is complete.
+    """
+    deadline = time.monotonic() + timeout
+    last_sizes = {}
+    while time.monotonic() < deadline:
+        names = os.listdir(download_dir)
+        if not any(name.endswith(".crdownload") for name in names):
+            for name in names:
+                if not name.endswith(".csv"):
+                    continue
+                path = os.path.join(download_dir, name)
+                size = os.path.getsize(path)
+                if size > 0 and last_sizes.get(name) == size:
+                    return path
+                last_sizes[name] = size
+        time.sleep(poll)
+    return None
+
+
+def select_season_phase(driver, selected_season_phase, timeout=10):
+    def phase_select(driver):
+        dropdowns = driver.find_elements(By.CSS_SELECTOR, "div.year_nav__selector")
+        return Select(dropdowns[1].find_element(By.TAG_NAME, "select"))
+
+    if phase_select(driver).first_selected_option.text == selected_season_phase:
+        return
+    phase_select(driver).select_by_visible_text(selected_season_phase)
+    # the page re-renders the selector, so wait on what it shows rather than a fixed sleep
+    WebDriverWait(driver, timeout, ignored_exceptions=(StaleElementReferenceException, IndexError)).until(
+        lambda d: phase_select(d).first_selected_option.text == selected_season_phase
+    )
+
 
-    driver = webdriver.Chrome(options=options)
+def download_category(driver, download_dir, year, selected_season_phase, category_name, url=CTG_URL, timeout=60,
+                      page_timeout=15):
+    """
+    Export one category into CTG_CSV_Data/<season>/. download_dir belongs to
+    this session only, so whatever lands there is this download.
+    Returns the saved path, or None if the page says it has no data for this
+    category. A page that shows neither a download button nor that message
+    (slow load, expired login, bot check) raises TimeoutError, so the export
+    is retried on the next run instead of being recorded as empty.
+    """
+    for name in os.listdir(download_dir):
+        os.remove(os.path.join(download_dir, name))
+    driver.get(f"{url}?season={year}&stat_category={CTG_CATEGORIES[category_name]}")
+    select_season_phase(driver, selected_season_phase)
+    try:
+        WebDriverWait(driver, page_timeout).until(EC.any_of(
+            EC.element_to_be_clickable((By.XPATH, DOWNLOAD_BUTTON_XPATH)),
+            EC.presence_of_element_located((By.XPATH, NO_DATA_XPATH)),
+        ))
+    except TimeoutException:
+        raise TimeoutError(f"no download button or no-data message within {page_timeout}s") from None
+    download_buttons = driver.find_elements(By.XPATH, DOWNLOAD_BUTTON_XPATH)
+    if not download_buttons:
+        return None
+    download_buttons[0].click()
+    downloaded = wait_for_download(download_dir, timeout)
+    if downloaded is None:
+        raise TimeoutError(f"download did not finish within {timeout}s")
+    target = ctg_path(year, selected_season_phase, category_name)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(downloaded, target)
+    return target
 
+
+def pending_downloads(years, phases=CTG_SEASON_PHASES, manifest=None):
+    """(year, phase, category) triples the manifest has neither a file nor a known-empty entry for"""
+    manifest = manifest or CTGManifest()
+    jobs = []
+    for year in years:
+        for phase in phases:
+            for category_name in CTG_CATEGORIES:
+                path = ctg_path(year, phase, category_name)
+                if not (manifest.is_downloaded(path) or manifest.is_known_empty(path)):
+                    jobs.append((year, phase, category_name))
+    return jobs
+
+
+def copy_login(source_driver, driver, url=CTG_URL):
+    # cookies can only be set for the domain that is currently loaded
     driver.get(url)
+    for cookie in source_driver.get_cookies():
+        cookie.pop("sameSite", None)
+        driver.add_cookie(cookie)
+
+
+def get_ctg_data(url=CTG_URL, years=CTG_YEARS, phases=CTG_SEASON_PHASES, sessions=DOWNLOAD_SESSIONS):
+    """
+    Backfill CTG_CSV_Data with a pool of browser sessions. Log in once in the
+    first window; the other sessions reuse its cookies. Each session gets its
+    own download directory and pulls (year, phase, category) jobs from a
+    shared queue until it is empty.
+    """
+    manifest = CTGManifest()
+    jobs = pending_downloads(years, phases, manifest)
+    if not jobs:
+        print("All CTG exports already downloaded")
+        return {}
+    sessions = max(1, min(sessions, len(jobs)))
+    download_root = CTG_CSV_DIR / ".downloads"
+    download_dirs = [download_root / f"session_{i}" for i in range(sessions)]
+    for download_dir in download_dirs:
+        download_dir.mkdir(parents=True, exist_ok=True)
+
+    drivers = [make_download_driver(download_dir) for download_dir in download_dirs]
+    drivers[0].get(url)
+    input("Press Enter after logging in in the first browser window...")
+    for driver in drivers[1:]:
+        copy_login(drivers[0], driver, url)
+
+    job_queue = queue.Queue()
+    for job in jobs:
+        job_queue.put(job)
+    lock = threading.Lock()
+    missing = {}
+
+    def worker(driver, download_dir):
+        while True:
+            try:
+                year, phase, category_name = job_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                saved = download_category(driver, str(download_dir), year, phase, category_name, url)
+            except Exception as e:
+                # left out of the manifest, so the next run tries again
+                print(f"Error downloading {category_name} {season_label(year)} {phase}: {e}")
+                continue
+            if saved is None:
+                # the page said it has no data; timeouts raise and never get here
+                manifest.mark_empty(ctg_path(year, phase, category_name))
+                with lock:
+                    missing.setdefault(f"{year}_{phase.replace(' ', '_')}", []).append(CTG_CATEGORIES[category_name])
+            else:
+                manifest.record(saved)
+                print(f"Saved {saved}")
+
+    print(f"Downloading {len(jobs)} exports with {sessions} browser session(s)")
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(driver, download_dir)) for driver, download_dir in zip(drivers, download_dirs)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        for driver in drivers:
+            driver.quit()
+        shutil.rmtree(download_root, ignore_errors=True)
+        manifest.save()
+    no_data_mapping.update(missing)
+    print(f"Finished in {time.perf_counter() - start:.0f}s, {sum(map(len, missing.values()))} export(s) without data")
+    return missing
 
-    input("Press Enter after logging in and navigating to the stats page...")
-    for year in range(2003, 2024):
-        download_by_year(driver, year, "Regular Season")
-        download_by_year(driver, year, "Playoffs")
 
 def get_all_playoff_teams(url="https://www.basketball-reference.com/playoffs/series.html"):
     # Read all HTML tables on the page
@@ -152,5 +251,5 @@ def get_all_playoff_teams(url="https://www.basketball-reference.com/playoffs/ser
         json.dump(playoff_teams, f, indent=4)
 
 if __name__ == "__main__":
-    # get_ctg_data(url = "https://cleaningtheglass.com/stats/players")
+    # get_ctg_data(url="https://cleaningtheglass.com/stats/players", sessions=DOWNLOAD_SESSIONS)
     get_all_playoff_teams(url = "https://www.basketball-reference.com/playoffs/series.html")
\ No newline at end of file
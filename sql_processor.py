@@ -1,10 +1,34 @@
 import pandas as pd
 import numpy as np
-import sqlite3
+import re
 import json
 from pathlib import Path
+import hashlib
+import argparse
+from typing import Callable, NamedTuple
+from feature_store import write_features, read_features
+from player_query import PlayerQuery
+from stats_backend import STATS_BACKENDS, get_backend
+from instrumentation import timed, count, profiled, write_report
+from master_csv_creator import PHASE_SUBDIRS
 
-common_keys = ['player', 'team', 'age', 'pos', 'min', 'season']
+common_keys = ['player', 'team', 'age', 'pos', 'min', 'season', 'phase']
+MANIFEST_TABLE = 'merged_csv_manifest'
+# seasons are appended on incremental reloads, so rowid alone no longer gives file order;
+# phase DESC puts Regular_Season ahead of Playoffs
+PLAYER_ORDER_QUERY = "SELECT * FROM player_season_stats ORDER BY phase DESC, season, rowid"
+# every team plays these, so their team table has a row for every team and season;
+# the other phases only have rows for the team-seasons that reached them
+FULL_GRID_PHASES = ('Regular_Season',)
+
+
+def player_order_query(phases=tuple(PHASE_SUBDIRS)):
+    """PLAYER_ORDER_QUERY restricted to phases, for backends that aggregate in SQL"""
+    unknown = [phase for phase in phases if phase not in PHASE_SUBDIRS]
+    if unknown:
+        raise ValueError(f"Unknown phase(s) {unknown}, expected one of {list(PHASE_SUBDIRS)}")
+    listed = ", ".join(f"'{phase}'" for phase in phases)
+    return f"SELECT * FROM player_season_stats WHERE phase IN ({listed}) ORDER BY phase DESC, season, rowid"
 playoff_teams, conf_finals_teams = {}, {}
 with open('playoff_teams.json', 'r') as f:
     playoff_teams = json.load(f)
@@ -12,163 +36,457 @@ with open('playoff_teams.json', 'r') as f:
 with open('conf_finals_teams.json', 'r') as f:
     conf_finals_teams = json.load(f)
 
-def load_seasons_to_db(merged_csv_dir, db_path='nba_stats.db'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("DROP TABLE IF EXISTS player_season_stats")
+# merged columns that never become features; one alternation, matched with re.search like DataFrame.filter
+DROPPED_COLUMNS_RE = re.compile('|'.join(
+    ["diff", "%_of_plays", "_freq_", "pts/play", "psa_rank", "_all_", "all_three", "all_mid", "2p%", "3p%"]
+))
+SHOOTING_ZONES = ['rim', 'short_mid', 'long_mid', 'corner_three', 'non_corner']
 
-    csv_files = sorted(Path(merged_csv_dir).glob('merged_*.csv'))
-    
-    print(f"Found {len(csv_files)} CSV files")
-    
+
+class PairedFeature(NamedTuple):
+    """
+    Columns derived from pairs of merged columns. The i-th column matched by
+    the left patterns (tried in order) pairs with the i-th one matched by the
+    right patterns; both are dropped once the derived column exists.
+    """
+    left: tuple                # compiled patterns
+    right: tuple
+    combine: Callable          # combine(left, right) on (rows x pairs) float arrays -> (rows x pairs)
+    name: Callable             # name(left column) -> derived column
+
+
+def geometric_mean(left, right):
+    return np.round(np.sqrt(left * right), 2)
+
+
+# a zone's impact is the geometric mean of how often and how well it is shot:
+# the player's own zone ranks and the on/off team and opponent ones
+ZONE_IMPACT_FEATURES = [
+    PairedFeature(
+        left=(re.compile(f'{zone}_frequency'), re.compile(f'_frequency:_{zone}')),
+        right=(re.compile(f'{zone}_accuracy'), re.compile(f'_team_fg%:_{zone}')),
+        combine=geometric_mean,
+        name=lambda col: f"{col.replace('_frequency', '')}_impact",
+    )
+    for zone in SHOOTING_ZONES
+]
+
+
+def resolve_pairs(columns, features):
+    """(feature, derived column, left column, right column) for every pair; a column feeds at most one pair"""
+    remaining = list(columns)
+    pairs = []
+    for feature in features:
+        lefts = [col for pattern in feature.left for col in remaining if pattern.search(col)]
+        rights = [col for pattern in feature.right for col in remaining if pattern.search(col)]
+        matched = list(zip(lefts, rights))
+        pairs += [(feature, feature.name(left), left, right) for left, right in matched]
+        used = {col for pair in matched for col in pair}
+        remaining = [col for col in remaining if col not in used]
+    return pairs
+
+
+def derive_paired_features(df, features):
+    """
+    Every derived column of features, appended in pattern-table order. Pairs
+    sharing a combine function are computed in one call over stacked arrays,
+    and every source column is dropped in one go.
+    """
+    pairs = resolve_pairs(df.columns, features)
+    derived = {}
+    for combine in dict.fromkeys(feature.combine for feature, _, _, _ in pairs):
+        group = [pair for pair in pairs if pair[0].combine is combine]
+        values = combine(
+            df[[left for _, _, left, _ in group]].to_numpy(dtype=float),
+            df[[right for _, _, _, right in group]].to_numpy(dtype=float),
+        )
+        derived.update(zip([name for _, name, _, _ in group], values.T))
+    sources = [col for _, _, left, right in pairs for col in (left, right)]
+    derived_df = pd.DataFrame({name: derived[name] for _, name, _, _ in pairs}, index=df.index)
+    return pd.concat([df.drop(columns=sources), derived_df], axis=1)
+
+
+def derive_player_features(combined_df):
+    combined_df = combined_df.drop(columns=[col for col in combined_df.columns if DROPPED_COLUMNS_RE.search(col)])
+    with timed('sql_processor.zone_impact'):
+        combined_df = derive_paired_features(combined_df, ZONE_IMPACT_FEATURES)
+    count('sql_processor.impact_columns', sum(col.endswith('_impact') for col in combined_df.columns))
+    return combined_df
+
+
+def merged_csv_files(merged_csv_dir, phases=tuple(PHASE_SUBDIRS)):
+    """(phase, season, path) of every merged CSV, phase by phase"""
+    return [
+        (phase, csv_file.stem.replace('merged_', ''), csv_file)
+        for phase in phases
+        for csv_file in sorted((Path(merged_csv_dir) / PHASE_SUBDIRS[phase]).glob('merged_*.csv'))
+    ]
+
+
+def read_season_csvs(season_files):
     all_data = []
     
-    for csv_file in csv_files:
-        print(f"Loading {csv_file.name}...")
-        
-        season = csv_file.stem.replace('merged_', '')
+    for phase, season, csv_file in season_files:
+        print(f"Loading {phase} {csv_file.name}...")
         
         df = pd.read_csv(csv_file)
 
         df['season'] = season
+        df['phase'] = phase
         
         all_data.append(df)
     
-    combined_df = pd.concat(all_data, ignore_index=True)
-
-    regexes = ["diff", "%_of_plays", "_freq_", "pts/play", "psa_rank", "_all_", "all_three", "all_mid", "2p%", "3p%"]
-    ""
-    # drop all columns matching the regexes
-    for regex in regexes:
-        combined_df.drop(list(combined_df.filter(regex=regex)), axis=1, inplace=True)
-
-    shooting_zones = ['rim', 'short_mid', 'long_mid', 'corner_three', 'non_corner']
-    for zone in shooting_zones:
-        # use regex to find zone frequency and accuracy columns
-        freq_col_regexes = [f'{zone}_frequency', f'_frequency:_{zone}']
-        acc_col_regexes = [f'{zone}_accuracy', f'_team_fg%:_{zone}']
-        freq_cols = []
-        acc_cols = []
-        
-        for i in range(len(freq_col_regexes)):
-            freq_col_regex = freq_col_regexes[i]
-            acc_col_regex = acc_col_regexes[i]
-            print(acc_col_regex)
-            freq_cols += list(combined_df.filter(regex=freq_col_regex))
-            acc_cols += list(combined_df.filter(regex=acc_col_regex))
-            print(list(combined_df.filter(regex=acc_col_regex)))
-        print(zone, freq_cols, acc_cols, "\n")
-        # create zone impact column (geometric mean of frequency and accuracy) using regex to find frequency and accuracy columns
-        for f_col, a_col in zip(freq_cols, acc_cols):
-            impact_col_name = f"{f_col.replace('_frequency','')}_impact"
-            combined_df[impact_col_name] = round(np.sqrt(combined_df[f_col] * combined_df[a_col]), 2)
-            # drop the original frequency and accuracy columns
-            combined_df.drop(columns=[f_col, a_col], inplace=True)
+    return pd.concat(all_data, ignore_index=True)
+
+
+def file_fingerprint(path):
+    stat = path.stat()
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha.hexdigest()}
+
+
+def read_manifest(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} "
+        "(phase TEXT, season TEXT, file TEXT, size INTEGER, mtime REAL, sha256 TEXT, PRIMARY KEY (phase, season))"
+    )
+    rows = cursor.execute(f"SELECT phase, season, file, size, mtime, sha256 FROM {MANIFEST_TABLE}").fetchall()
+    return {
+        (phase, season): {'file': file, 'size': size, 'mtime': mtime, 'sha256': sha256}
+        for phase, season, file, size, mtime, sha256 in rows
+    }
+
+
+def write_manifest(conn, entries):
+    read_manifest(conn)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {MANIFEST_TABLE} (phase, season, file, size, mtime, sha256) VALUES (?, ?, ?, ?, ?, ?)",
+        [(phase, season, e['file'], e['size'], e['mtime'], e['sha256']) for (phase, season), e in entries.items()]
+    )
+
+
+def changed_season_files(conn, season_files):
+    manifest = read_manifest(conn)
+    changed = {}
+    for phase, season, csv_file in season_files:
+        previous = manifest.get((phase, season))
+        stat = csv_file.stat()
+        # unchanged size + mtime means the file was not rewritten, skip hashing it
+        if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+            continue
+        fingerprint = file_fingerprint(csv_file)
+        fingerprint['file'] = csv_file.name
+        if previous and previous['sha256'] == fingerprint['sha256']:
+            write_manifest(conn, {(phase, season): fingerprint})
+            continue
+        changed[(phase, season)] = (csv_file, fingerprint)
+    conn.commit()
+    return changed
+
+
+@profiled('sql_processor.load_seasons_to_db')
+def load_seasons_to_db(merged_csv_dir, db_path=None, backend=None, phases=tuple(PHASE_SUBDIRS)):
+    backend = get_backend(backend, db_path)
+    conn = backend.connect()
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS player_season_stats")
+    cursor.execute(f"DROP TABLE IF EXISTS {MANIFEST_TABLE}")
+
+    season_files = merged_csv_files(merged_csv_dir, phases)
+    
+    for phase in phases:
+        print(f"Found {sum(p == phase for p, _, _ in season_files)} {phase} CSV files")
+    
+    # every phase goes through the feature derivation and the load together
+    combined_df = derive_player_features(read_season_csvs(season_files))
+    count('sql_processor.player_rows_loaded', len(combined_df))
     
-    combined_df.to_sql('player_season_stats', conn, if_exists='replace', index=False)
+    backend.write_table(conn, combined_df, 'player_season_stats')
     
     cursor = conn.cursor()
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_season ON player_season_stats (player, season, team)")
+    # PlayerQuery filters are season/team first
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_season_team ON player_season_stats (season, team)")
+    manifest = {}
+    for phase, season, csv_file in season_files:
+        manifest[(phase, season)] = dict(file_fingerprint(csv_file), file=csv_file.name)
+    write_manifest(conn, manifest)
     conn.commit()
 
     conn.close()
     
     combined_df.to_csv('all_player_season_stats.csv', index=False)
+    write_features(combined_df, 'player_season_stats')
     return combined_df
 
 
-def aggregate_to_team_level(db_path='nba_stats.db', output_csv='team_aggregated_stats.csv'):
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("SELECT * FROM player_season_stats", conn)
-    
-    print(f"Loaded {len(df)} player-season records")
-    
-    rank_cols = [col for col in df.columns if col not in common_keys]
-    
-    print(f"Found {len(rank_cols)} stat columns to aggregate")
-    
-    teams = df['team'].unique()
-    seasons = df['season'].unique()
-    
-    team_stats = []
-
-    for team in teams:
-        for season in seasons:
-            team_season_df = df[(df['team'] == team) & (df['season'] == season)]
-            team_row = {
-                'Team': team,
-                'Season': season,
-            }
-            
-            total_team_minutes = team_season_df['min'].sum()
-            
-            for rank_col in rank_cols:
-                rank_values = team_season_df[rank_col]
-
-                max_value = rank_values.max()
-                team_row[f'{rank_col}_highest'] = max_value
-                
-                top2_values = rank_values.nlargest(2)
-                avg_top2 = round(top2_values.mean(), 2)
-                team_row[f'{rank_col}_top2_avg'] = avg_top2
-                
-                players_with_rank = team_season_df[team_season_df[rank_col].notna()]
-                
-                weighted_sum = 0
-                for _, player in players_with_rank.iterrows():
-                    player_rank = player[rank_col]
-                    player_minutes = player['min']
-                    weight = player_minutes / total_team_minutes
-                    weighted_sum += player_rank * weight
-                    
-                team_row[f'{rank_col}_weighted'] = round(weighted_sum, 2)
-
-            team_stats.append(team_row)
-    
-    # Create final dataframe
-    team_df = pd.DataFrame(team_stats)
-    
+@profiled('sql_processor.update_seasons_in_db')
+def update_seasons_in_db(merged_csv_dir, db_path=None, backend=None, phases=tuple(PHASE_SUBDIRS)):
+    """Reload only the (phase, season)s whose merged CSV changed since the last load.
+    Returns the refreshed (phase, season) pairs, or None if a full rebuild was needed."""
+    backend = get_backend(backend, db_path)
+    conn = backend.connect()
+    existing_cols = backend.table_columns(conn, 'player_season_stats')
+    if 'phase' not in existing_cols:
+        conn.close()
+        print("No player_season_stats table with a phase column yet, running a full load")
+        load_seasons_to_db(merged_csv_dir, db_path, backend.name, phases)
+        return None
+
+    season_files = merged_csv_files(merged_csv_dir, phases)
+    # a deleted merged CSV leaves rows behind that no changed file would replace
+    removed = ({key for key in read_manifest(conn) if key[0] in phases}
+               - {(phase, season) for phase, season, _ in season_files})
+    if removed:
+        conn.close()
+        print(f"Merged CSV(s) removed for {', '.join(f'{phase} {season}' for phase, season in sorted(removed))}, running a full load")
+        load_seasons_to_db(merged_csv_dir, db_path, backend.name, phases)
+        return None
+
+    changed = changed_season_files(conn, season_files)
+    if not changed:
+        conn.close()
+        print("All seasons up to date")
+        return []
+
+    print(f"Reloading {len(changed)} changed season(s): {', '.join(f'{phase} {season}' for phase, season in changed)}")
+    season_df = derive_player_features(read_season_csvs(
+        [(phase, season, csv_file) for (phase, season), (csv_file, _) in changed.items()]
+    ))
+    count('sql_processor.player_rows_loaded', len(season_df))
+    if set(season_df.columns) != set(existing_cols):
+        conn.close()
+        print("Column layout changed, running a full load")
+        load_seasons_to_db(merged_csv_dir, db_path, backend.name, phases)
+        return None
+
+    phase_seasons = list(changed)
+    # databases loaded before the index existed
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_season_team ON player_season_stats (season, team)")
+    conn.executemany("DELETE FROM player_season_stats WHERE phase = ? AND season = ?", phase_seasons)
+    backend.write_table(conn, season_df[existing_cols], 'player_season_stats', if_exists='append')
+    write_manifest(conn, {key: fingerprint for key, (_, fingerprint) in changed.items()})
+    conn.commit()
+
+    combined_df = PlayerQuery(conn, backend=backend).fetch()
+    conn.close()
+
+    combined_df.to_csv('all_player_season_stats.csv', index=False)
+    write_features(combined_df, 'player_season_stats')
+    return phase_seasons
+
+
+def aggregate_team_stats(df, rank_cols, teams=None, seasons=None, keep_empty=True):
+    teams = df['team'].unique() if teams is None else np.asarray(teams, dtype=object)
+    seasons = df['season'].unique() if seasons is None else np.asarray(seasons, dtype=object)
+    n_groups = len(teams) * len(seasons)
+
+    # every team x season pair gets a row, in first-seen order, matching the original loop
+    group = pd.Index(teams).get_indexer(df['team']) * len(seasons) + pd.Index(seasons).get_indexer(df['season'])
+    order = np.argsort(group, kind='stable')
+    sorted_group = group[order]
+    counts = np.bincount(group, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    slot = np.arange(len(df)) - starts[sorted_group]
+    width = max(int(counts.max()) if len(df) else 0, 2)
+
+    # (team-season, player slot, stat) grid, NaN padded
+    values = np.full((n_groups, width, len(rank_cols)), np.nan)
+    values[sorted_group, slot] = df[rank_cols].to_numpy(dtype=float)[order]
+    minutes = np.zeros((n_groups, width))
+    minutes[sorted_group, slot] = df['min'].to_numpy(dtype=float)[order]
+
+    highest = np.fmax.reduce(values, axis=1)
+
+    top2 = -np.partition(-values, 1, axis=1)[:, :2, :]
+    top2_count = (~np.isnan(top2)).sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        top2_avg = np.round(np.nansum(top2, axis=1) / np.where(top2_count == 0, np.nan, top2_count), 2)
+
+    # accumulate slot by slot so the float sums match the per-player loop exactly
+    total_minutes = np.zeros(n_groups)
+    for s in range(width):
+        total_minutes += minutes[:, s]
+    weighted = np.zeros((n_groups, len(rank_cols)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = minutes / total_minutes[:, None]
+        for s in range(width):
+            slot_values = values[:, s, :]
+            weighted += np.where(np.isnan(slot_values), 0.0, slot_values * weights[:, s, None])
+    weighted = np.round(weighted, 2)
+
+    # keep_empty=False leaves out the team-seasons without player rows
+    kept = slice(None) if keep_empty else counts > 0
+    highest, top2_avg, weighted = highest[kept], top2_avg[kept], weighted[kept]
+    team_cols = {
+        'Team': np.repeat(teams, len(seasons))[kept],
+        'Season': np.tile(seasons, len(teams))[kept],
+    }
+    for i, rank_col in enumerate(rank_cols):
+        col_highest = highest[:, i]
+        if pd.api.types.is_integer_dtype(df[rank_col]) and not np.isnan(col_highest).any():
+            col_highest = col_highest.astype(np.int64)
+        team_cols[f'{rank_col}_highest'] = col_highest
+        team_cols[f'{rank_col}_top2_avg'] = top2_avg[:, i]
+        team_cols[f'{rank_col}_weighted'] = weighted[:, i]
+
+    return pd.DataFrame(team_cols)
+
+
+def aggregate_team_stats_by_phase(df, rank_cols, teams=None, seasons=None):
+    """
+    aggregate_team_stats for each phase, stacked phase by phase with a Phase
+    column. The team and season lists are taken once from every phase, so
+    every phase keeps one team and season order. FULL_GRID_PHASES get a row
+    for every team and season; the others only for the team-seasons with
+    player rows in them, so teams that missed the playoffs get no Playoffs row.
+    """
+    teams = df['team'].unique() if teams is None else teams
+    seasons = df['season'].unique() if seasons is None else seasons
+    phase_dfs = []
+    for phase, phase_df in df.groupby('phase', sort=False):
+        team_df = aggregate_team_stats(phase_df, rank_cols, teams=teams, seasons=seasons,
+                                       keep_empty=phase in FULL_GRID_PHASES)
+        team_df.insert(2, 'Phase', phase)
+        phase_dfs.append(team_df)
+    return pd.concat(phase_dfs, ignore_index=True)
+
 
-    team_df.to_sql('team_aggregated_stats', conn, if_exists='replace', index=False)
+@profiled('sql_processor.aggregate_to_team_level')
+def aggregate_to_team_level(db_path=None, output_csv='team_aggregated_stats.csv', phase_seasons=None, backend=None,
+                            phases=tuple(PHASE_SUBDIRS)):
+    backend = get_backend(backend, db_path)
+    conn = backend.connect()
+    if phase_seasons is not None:
+        phase_seasons = [(phase, season) for phase, season in phase_seasons if phase in phases]
+    if phase_seasons and 'Phase' in backend.table_columns(conn, 'team_aggregated_stats'):
+        team_df = refresh_team_seasons(conn, phase_seasons, backend, phases)
+    elif hasattr(backend, 'aggregate_team_stats'):
+        rank_cols = [col for col in backend.table_columns(conn, 'player_season_stats') if col not in common_keys]
+        
+        print(f"Aggregating {len(rank_cols)} stat columns in {backend.name}")
+        
+        team_df = backend.aggregate_team_stats(conn, rank_cols, player_order_query(phases), FULL_GRID_PHASES)
+        backend.write_table(conn, team_df, 'team_aggregated_stats')
+    else:
+        df = PlayerQuery(conn, backend=backend).where(phase=list(phases)).fetch()
+        
+        print(f"Loaded {len(df)} player-season records")
+        
+        rank_cols = [col for col in df.columns if col not in common_keys]
+        
+        print(f"Found {len(rank_cols)} stat columns to aggregate")
+        
+        team_df = aggregate_team_stats_by_phase(df, rank_cols)
+        
+
+        backend.write_table(conn, team_df, 'team_aggregated_stats')
     
     team_df.to_csv(output_csv, index=False)
-    print(f"\n✓ Saved to database and {output_csv}")
+    write_features(team_df, 'team_aggregated_stats')
+    print(f"\n✓ Saved to database, feature store and {output_csv}")
     
     conn.close()
     
     return team_df
 
-def label_df(df, mode):
-    df = df.drop(['conf_finals', 'playoffs'], errors='ignore')
-    labels = []
-    for _, row in df.iterrows():
-        season = row['Season']
-        team = row['Team']
-        if mode == 'pretenders':
-            if team in playoff_teams[season]:
-                labels.append(0)
-            else:
-                labels.append(1)
-
-        elif mode == 'contenders':
-            if team in conf_finals_teams[season]:
-                labels.append(1)
-            else:
-                labels.append(0)
-    if mode == 'contenders':
-        df['conf_finals'] = labels
-        df.to_csv("contenders_stats_labeled.csv")
-    elif mode == 'pretenders':
-        df['playoffs'] = labels
-        df.to_csv("pretenders_stats_labeled.csv", index=False)
+
+def refresh_team_seasons(conn, phase_seasons, backend, phases=tuple(PHASE_SUBDIRS)):
+    players = PlayerQuery(conn, backend=backend).where(phase=list(phases))
+    key_df = players.select('phase', 'team', 'season').fetch()
+    phases = key_df['phase'].unique()
+    teams = key_df['team'].unique()
+    all_seasons = key_df['season'].unique()
+
+    seasons_by_phase = {}
+    for phase, season in phase_seasons:
+        seasons_by_phase.setdefault(phase, []).append(season)
+
+    for phase, seasons in seasons_by_phase.items():
+        df = players.where(phase=phase, season=seasons).fetch()
+        print(f"Refreshing {phase} team rows for {len(seasons)} season(s) from {len(df)} player-season records")
+
+        rank_cols = [col for col in df.columns if col not in common_keys]
+        season_team_df = aggregate_team_stats_by_phase(df, rank_cols, teams=teams, seasons=[s for s in all_seasons if s in set(seasons)])
+
+        placeholders = ', '.join('?' * len(seasons))
+        conn.execute(f"DELETE FROM team_aggregated_stats WHERE Phase = ? AND Season IN ({placeholders})", [phase] + seasons)
+        backend.write_table(conn, season_team_df, 'team_aggregated_stats', if_exists='append')
+    conn.commit()
+
+    # same phase-major, then team, then season row order as a full aggregation
+    team_df = backend.read_query(conn, "SELECT * FROM team_aggregated_stats")
+    team_df = team_df[team_df['Phase'].isin(phases)]
+    phase_pos = pd.Index(phases).get_indexer(team_df['Phase'])
+    team_pos = pd.Index(teams).get_indexer(team_df['Team'])
+    season_pos = pd.Index(all_seasons).get_indexer(team_df['Season'])
+    team_df = team_df.iloc[np.lexsort((season_pos, team_pos, phase_pos))].reset_index(drop=True)
+    return team_df[[col for col in team_df.columns if col in season_team_df.columns]]
+
+
+# label column -> (team lists, value for teams in the list); pretenders are the teams that missed the playoffs
+LABELS = {
+    'playoffs': (playoff_teams, 0),
+    'conf_finals': (conf_finals_teams, 1),
+}
+LABELED_TABLE = 'team_aggregated_stats_labeled'
+
+
+def label_table(labels=LABELS):
+    """One row per (Season, Team) with every label column, built from the JSON team lists"""
+    keys = pd.MultiIndex.from_tuples(
+        sorted({(season, team) for teams_by_season, _ in labels.values()
+                for season, teams in teams_by_season.items() for team in teams}),
+        names=['Season', 'Team']
+    )
+    table = pd.DataFrame(index=keys)
+    for column, (teams_by_season, listed_value) in labels.items():
+        listed = pd.MultiIndex.from_tuples(
+            [(season, team) for season, teams in teams_by_season.items() for team in teams],
+            names=['Season', 'Team']
+        )
+        table[column] = np.where(keys.isin(listed), listed_value, 1 - listed_value)
+    return table
+
+
+def label_df(df, labels=LABELS, output_csv=f'{LABELED_TABLE}.csv'):
+    """Add every label column in one join on (Season, Team) and write a single labeled table"""
+    df = df.drop(list(labels), axis=1, errors='ignore')
+    joined = df[['Season', 'Team']].join(label_table(labels), on=['Season', 'Team'])
+    # team-seasons missing from every list are unlisted for each label
+    label_columns = pd.DataFrame({
+        column: joined[column].fillna(1 - listed_value).astype(int)
+        for column, (_, listed_value) in labels.items()
+    })
+    df = pd.concat([df, label_columns], axis=1)
+    df.to_csv(output_csv, index=False)
+    write_features(df, LABELED_TABLE)
     return df
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--incremental', action='store_true', help='only reload seasons whose merged CSV changed')
+    parser.add_argument('--backend', choices=sorted(STATS_BACKENDS), default=None, help='storage engine (default: $STATS_BACKEND or sqlite)')
+    parser.add_argument('--db', default=None, help="database file (default: nba_stats.db / nba_stats.duckdb)")
+    parser.add_argument('--phases', nargs='+', choices=list(PHASE_SUBDIRS), default=list(PHASE_SUBDIRS),
+                        help='season phases to load and aggregate (default: all)')
+    args = parser.parse_args()
+    phases = tuple(args.phases)
+
     MERGED_CSV_DIR = 'merged_csvs'  
-    DB_PATH = 'nba_stats.db'
 
-    player_df = load_seasons_to_db(MERGED_CSV_DIR, DB_PATH)
-    aggregate_to_team_level()
-    read_df = pd.read_csv('team_aggregated_stats.csv')
-    label_df(read_df, 'contenders')
-    label_df(read_df, 'pretenders')
\ No newline at end of file
+    if args.incremental:
+        changed_seasons = update_seasons_in_db(MERGED_CSV_DIR, args.db, args.backend, phases)
+        if changed_seasons == []:
+            raise SystemExit(0)
+        aggregate_to_team_level(args.db, phase_seasons=changed_seasons, backend=args.backend, phases=phases)
+    else:
+        player_df = load_seasons_to_db(MERGED_CSV_DIR, args.db, args.backend, phases)
+        aggregate_to_team_level(args.db, backend=args.backend, phases=phases)
+    read_df = read_features('team_aggregated_stats')
+    label_df(read_df)
+    write_report('sql_processor')
\ No newline at end of file
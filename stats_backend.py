@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import pandas as pd
+
+# Where sql_processor keeps player_season_stats and the team tables: "sqlite" or "duckdb"
+DEFAULT_STATS_BACKEND = os.getenv("STATS_BACKEND", "sqlite")
+DEFAULT_DB_PATHS = {
+    "sqlite": "nba_stats.db",
+    "duckdb": "nba_stats.duckdb",
+}
+
+
+def quote(identifier):
+    # stat columns carry %, :, / and + in their names
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SQLiteBackend:
+    """Row store; team aggregation pulls player rows into pandas"""
+    name = "sqlite"
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_DB_PATHS[self.name]
+
+    def connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def read_query(self, conn, sql, params=None):
+        return pd.read_sql_query(sql, conn, params=params)
+
+    def read_chunks(self, conn, sql, params=None, chunksize=2000):
+        yield from pd.read_sql_query(sql, conn, params=params, chunksize=chunksize)
+
+    def write_table(self, conn, df, table, if_exists='replace'):
+        df.to_sql(table, conn, if_exists=if_exists, index=False)
+
+    def table_columns(self, conn, table):
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({quote(table)})").fetchall()]
+
+
+class DuckDBBackend(SQLiteBackend):
+    """Embedded columnar engine; team aggregation runs as one SQL query (team_aggregation_sql)"""
+    name = "duckdb"
+
+    def connect(self):
+        import duckdb
+        return duckdb.connect(self.db_path)
+
+    def read_query(self, conn, sql, params=None):
+        return conn.execute(sql, params or []).df()
+
+    def read_chunks(self, conn, sql, params=None, chunksize=2000):
+        reader = conn.execute(sql, params or []).fetch_record_batch(chunksize)
+        for batch in reader:
+            yield batch.to_pandas()
+
+    def write_table(self, conn, df, table, if_exists='replace'):
+        conn.register('incoming_df', df)
+        try:
+            if if_exists == 'replace' or not self.table_columns(conn, table):
+                conn.execute(f"CREATE OR REPLACE TABLE {quote(table)} AS SELECT * FROM incoming_df")
+            else:
+                conn.execute(f"INSERT INTO {quote(table)} BY NAME SELECT * FROM incoming_df")
+        finally:
+            conn.unregister('incoming_df')
+
+    def table_columns(self, conn, table):
+        # PRAGMA table_info raises for a missing table here instead of returning no rows
+        rows = conn.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position", [table]
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def aggregate_team_stats(self, conn, rank_cols, player_query, full_grid_phases=()):
+        team_df = self.read_query(conn, team_aggregation_sql(rank_cols, player_query, full_grid_phases))
+        dtypes = self.read_query(conn, f"SELECT * FROM ({player_query}) LIMIT 0").dtypes
+        return finish_team_aggregation(team_df, rank_cols, dtypes)
+
+
+STATS_BACKENDS = {backend.name: backend for backend in (SQLiteBackend, DuckDBBackend)}
+
+
+def get_backend(name=None, db_path=None):
+    name = name or DEFAULT_STATS_BACKEND
+    if name not in STATS_BACKENDS:
+        raise ValueError(f"Unknown stats backend {name!r}, expected one of {sorted(STATS_BACKENDS)}")
+    return STATS_BACKENDS[name](db_path)
+
+
+def round2(expr):
+    # np.round(x, 2) is rint(x * 100) / 100; ROUND_EVEN(x, 2) disagrees on values like 95.66499999
+    return f"ROUND_EVEN(({expr}) * 100, 0) / 100"
+
+
+def team_aggregation_sql(rank_cols, player_query, full_grid_phases=()):
+    """
+    aggregate_team_stats_by_phase as one DuckDB query. The stats are
+    unpivoted to (phase, team, season, stat, value) rows, a ROW_NUMBER window
+    ranks players within each phase-team-season-stat for the top-2 average,
+    and PIVOT turns MAX / top-2 AVG / minutes-weighted SUM back into one row
+    per phase-team-season, in first-seen order. full_grid_phases get a row
+    for every team and season; the other phases only for the team-seasons
+    with player rows in them.
+    """
+    stats = ", ".join(quote(c) for c in rank_cols)
+    # listing the values keeps PIVOT from running the whole query once more to discover them
+    stat_names = ", ".join("'" + c.replace("'", "''") + "'" for c in rank_cols)
+    full_grid = " OR p.phase IN ({})".format(", ".join(f"'{phase}'" for phase in full_grid_phases)) if full_grid_phases else ""
+    return f"""
+    WITH players AS (
+        SELECT ROW_NUMBER() OVER () AS row_order, * FROM ({player_query})
+    ),
+    teams AS (SELECT team, MIN(row_order) AS team_order FROM players GROUP BY team),
+    seasons AS (SELECT season, MIN(row_order) AS season_order FROM players GROUP BY season),
+    phases AS (SELECT phase, MIN(row_order) AS phase_order FROM players GROUP BY phase),
+    team_minutes AS (SELECT phase, team, season, SUM(min) AS total_min FROM players GROUP BY phase, team, season),
+    long AS (
+        UNPIVOT (SELECT row_order, phase, team, season, min, {stats} FROM players)
+        ON {stats} INTO NAME stat VALUE value
+    ),
+    ranked AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY phase, team, season, stat ORDER BY value DESC) AS stat_rank
+        FROM long
+        WHERE NOT isnan(value)
+    ),
+    stat_rows AS (
+        SELECT r.phase, r.team, r.season, r.stat,
+               MAX(r.value) AS highest,
+               {round2("AVG(r.value) FILTER (WHERE r.stat_rank <= 2)")} AS top2_avg,
+               {round2("SUM(r.value * (r.min / m.total_min) ORDER BY r.row_order)")} AS weighted
+        FROM ranked r JOIN team_minutes m USING (phase, team, season)
+        GROUP BY r.phase, r.team, r.season, r.stat
+    ),
+    wide AS (
+        PIVOT stat_rows ON stat IN ({stat_names})
+        USING FIRST(highest) AS highest, FIRST(top2_avg) AS top2_avg, FIRST(weighted) AS weighted
+        GROUP BY phase, team, season
+    )
+    SELECT t.team AS Team, s.season AS Season, p.phase AS Phase, wide.* EXCLUDE (phase, team, season)
+    FROM phases p CROSS JOIN teams t CROSS JOIN seasons s
+    LEFT JOIN team_minutes m ON m.phase = p.phase AND m.team = t.team AND m.season = s.season
+    LEFT JOIN wide ON wide.phase = p.phase AND wide.team = t.team AND wide.season = s.season
+    WHERE m.phase IS NOT NULL{full_grid}
+    ORDER BY p.phase_order, t.team_order, s.season_order
+    """
+
+
+def finish_team_aggregation(team_df, rank_cols, player_dtypes):
+    """Column order, dtypes and empty-group values of aggregate_team_stats_by_phase for the SQL result"""
+    missing = pd.Series(float('nan'), index=team_df.index)
+    team_cols = {'Team': team_df['Team'], 'Season': team_df['Season'], 'Phase': team_df['Phase']}
+    for rank_col in rank_cols:
+        highest = team_df.get(f'{rank_col}_highest', missing).astype(float)
+        if pd.api.types.is_integer_dtype(player_dtypes[rank_col]) and not highest.isna().any():
+            highest = highest.astype('int64')
+        team_cols[f'{rank_col}_highest'] = highest
+        team_cols[f'{rank_col}_top2_avg'] = team_df.get(f'{rank_col}_top2_avg', missing).astype(float)
+        # a team-season with no values for a stat weighs in at 0, as in the pandas path
+        team_cols[f'{rank_col}_weighted'] = team_df.get(f'{rank_col}_weighted', missing).astype(float).fillna(0.0)
+    return pd.DataFrame(team_cols)
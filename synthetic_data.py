@@ -0,0 +1,208 @@
+import json
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ctg_data import CTG_CSV_DIR, CTG_SEASON_PHASES, CTG_YEARS, CTG_CATEGORIES, CTGManifest, ctg_filename, ctg_path, season_label
+
+SYNTHETIC_SEED = 42
+# every category of this season is the template: its header is copied and its values resampled column by column
+TEMPLATE_SEASON_DIR = CTG_CSV_DIR / "2022-23"
+# scale 1 is the real data: 9.7k regular-season player-seasons over 21 seasons of 30 teams,
+# about half of each playoff roster in the playoff exports, ~50 trades per bbref page
+PLAYERS_PER_TEAM = 15.5
+PLAYOFF_ROSTER_SHARE = 0.5
+PLAYOFF_TEAMS_PER_LEAGUE = 16
+CONF_FINALS_TEAMS_PER_LEAGUE = 4
+TRADES_PER_YEAR = 50
+# signings, waivers and the like; bbref pages have ~17 other paragraphs per trade
+OTHER_PARAGRAPHS_PER_TRADE = 17
+# the years parse_trade_htmls reads
+TRADE_YEARS = range(2004, 2025)
+# label name -> team list file, as sql_processor reads them
+LABEL_FILES = {
+    "playoffs": "playoff_teams.json",
+    "conf_finals": "conf_finals_teams.json",
+}
+
+TEAM_NAMES = {
+    "ATL": "Atlanta Hawks", "BKN": "Brooklyn Nets", "BOS": "Boston Celtics", "CHA": "Charlotte Hornets",
+    "CHI": "Chicago Bulls", "CLE": "Cleveland Cavaliers", "DAL": "Dallas Mavericks", "DEN": "Denver Nuggets",
+    "DET": "Detroit Pistons", "GSW": "Golden State Warriors", "HOU": "Houston Rockets", "IND": "Indiana Pacers",
+    "LAC": "Los Angeles Clippers", "LAL": "Los Angeles Lakers", "MEM": "Memphis Grizzlies", "MIA": "Miami Heat",
+    "MIL": "Milwaukee Bucks", "MIN": "Minnesota Timberwolves", "NOP": "New Orleans Pelicans", "NYK": "New York Knicks",
+    "OKC": "Oklahoma City Thunder", "ORL": "Orlando Magic", "PHI": "Philadelphia 76ers", "PHX": "Phoenix Suns",
+    "POR": "Portland Trail Blazers", "SAC": "Sacramento Kings", "SAS": "San Antonio Spurs", "TOR": "Toronto Raptors",
+    "UTA": "Utah Jazz", "WAS": "Washington Wizards",
+}
+FIRST_NAMES = ["Marcus", "Tyler", "Andre", "Jalen", "Derrick", "Kevin", "Isaiah", "Brandon", "Darius", "Malik",
+               "Jordan", "Caleb", "Trey", "Xavier", "Nikola", "Luka", "Dennis", "Patrick", "Shawn", "Victor"]
+LAST_NAMES = ["Holloway", "Whitfield", "Okafor", "Brennan", "Castillo", "Mercer", "Lindqvist", "Abernathy", "Draper",
+              "Fontaine", "Gallagher", "Huxley", "Ivanov", "Jemison", "Kowalski", "Landry", "Monroe", "Navarro",
+              "Pryor", "Quinlan"]
+
+
+def synthetic_teams(leagues=1):
+    """The 30 real team codes for the first league; every further league reuses them with its number appended"""
+    return [team if league == 0 else f"{team}{league + 1}" for league in range(leagues) for team in TEAM_NAMES]
+
+
+def read_templates(template_dir=TEMPLATE_SEASON_DIR):
+    return {
+        phase: {name: pd.read_csv(Path(template_dir) / ctg_filename(name, phase)) for name in CTG_CATEGORIES}
+        for phase in CTG_SEASON_PHASES
+    }
+
+
+def synthetic_category(template, roster, rng):
+    """
+    One export with the template's columns: the roster's key columns and,
+    for every other column, values drawn from the template's own column, so
+    ranks, percentages and blanks keep their real formats and frequencies.
+    Rows are shuffled; the on/off exports do not share a row order either.
+    """
+    picks = {col: rng.integers(0, len(template), len(roster)) for col in template.columns if col not in roster}
+    df = pd.DataFrame({
+        col: roster[col].to_numpy() if col in roster else template[col].to_numpy()[picks[col]]
+        for col in template.columns
+    })
+    return df.iloc[rng.permutation(len(df))]
+
+
+def generate_ctg_exports(root=CTG_CSV_DIR, seasons=len(CTG_YEARS), scale=1.0, leagues=1, seed=SYNTHETIC_SEED,
+                         template_dir=TEMPLATE_SEASON_DIR):
+    """
+    CTG_CSV_Data-shaped exports for every season, phase and category, plus
+    their manifest. scale multiplies the players per team; leagues adds
+    groups of 30 teams. Returns the playoff and conference-finals team lists
+    ({label: {season: [teams]}}) drawn for the synthetic seasons.
+    """
+    rng = np.random.default_rng(seed)
+    templates = read_templates(template_dir)
+    teams = synthetic_teams(leagues)
+    per_team = max(1, round(PLAYERS_PER_TEAM * scale))
+    per_playoff_team = max(1, round(per_team * PLAYOFF_ROSTER_SHARE))
+    base = templates[CTG_SEASON_PHASES[0]][next(iter(CTG_CATEGORIES))]
+    labels = {name: {} for name in LABEL_FILES}
+
+    for year in range(CTG_YEARS.start, CTG_YEARS.start + seasons):
+        season = season_label(year)
+        n = per_team * len(teams)
+        picks = rng.integers(0, len(base), n)
+        roster = pd.DataFrame({
+            'Player': [f"Synthetic Player {i}" for i in range(n)],
+            'Age': base['Age'].to_numpy()[picks],
+            'Team': np.repeat(teams, per_team),
+            'Pos': base['Pos'].to_numpy()[picks],
+            'MIN': base['MIN'].to_numpy()[picks],
+        })
+        playoff_teams, conf_finals_teams = [], []
+        for league in range(leagues):
+            drawn = rng.permutation(teams[league * len(TEAM_NAMES):(league + 1) * len(TEAM_NAMES)])[:PLAYOFF_TEAMS_PER_LEAGUE]
+            playoff_teams += sorted(drawn)
+            conf_finals_teams += sorted(drawn[:CONF_FINALS_TEAMS_PER_LEAGUE])
+        labels['playoffs'][season] = playoff_teams
+        labels['conf_finals'][season] = conf_finals_teams
+
+        playoff_roster = roster[roster['Team'].isin(playoff_teams)].groupby('Team', sort=False).head(per_playoff_team)
+        for phase, rows in zip(CTG_SEASON_PHASES, (roster, playoff_roster)):
+            for name, template in templates[phase].items():
+                path = ctg_path(year, phase, name, root)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                synthetic_category(template, rows, rng).to_csv(path, index=False)
+
+    CTGManifest(root).rebuild().save()
+    return labels
+
+
+def write_label_files(labels, out_dir="."):
+    for name, teams_by_season in labels.items():
+        with open(Path(out_dir) / LABEL_FILES[name], "w") as f:
+            json.dump(teams_by_season, f, indent=4)
+
+
+def player_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def trade_paragraph(rng, year, llm_share):
+    """
+    One bbref-style trade paragraph. Most are the plain "X traded A to Y for
+    B" form the rule parser resolves; llm_share of them carry an asset the
+    rules do not know, so their clause goes to the model.
+    """
+    def team(code, attr):
+        return f'<a data-attr-{attr}="{code}" href="/teams/{code}/{year}.html">{TEAM_NAMES[code]}</a>'
+
+    def player():
+        name = player_name(rng)
+        return f'<a href="/players/{name.split()[1][0].lower()}/{name.replace(" ", "").lower()}01.html">{name}</a>'
+
+    a, b, c = rng.choice(list(TEAM_NAMES), 3, replace=False)
+    if rng.random() < llm_share:
+        return f"The {team(a, 'from')} traded {player()} and cash considerations to the {team(b, 'to')} for {player()}."
+    kind = rng.integers(3)
+    if kind == 0:
+        return f"The {team(a, 'from')} traded {player()} to the {team(b, 'to')} for {player()}."
+    if kind == 1:
+        return (f"The {team(a, 'from')} traded {player()} and a {year + 1} 2nd round draft pick "
+                f"({player_name(rng)} was later selected) to the {team(b, 'to')} for {player()}.")
+    return (f"In a 3-team trade, the {team(a, 'from')} traded {player()} to the {team(b, 'to')}; "
+            f"the {team(b, 'from')} traded {player()} to the {team(c, 'to')}; "
+            f"and the {team(c, 'from')} traded {player()} to the {team(a, 'to')}.")
+
+
+def other_paragraph(rng, year):
+    code = rng.choice(list(TEAM_NAMES))
+    verb = rng.choice(["signed", "waived", "released", "claimed"])
+    return f'The <a href="/teams/{code}/{year}.html">{TEAM_NAMES[code]}</a> {verb} {player_name(rng)}.'
+
+
+def generate_trade_htmls(html_dir="bbref_htmls", years=TRADE_YEARS, scale=1.0, llm_share=0.2, seed=SYNTHETIC_SEED):
+    """One bbref transactions page per year, with round(TRADES_PER_YEAR * scale) trades among the other moves"""
+    rng = np.random.default_rng(seed)
+    Path(html_dir).mkdir(parents=True, exist_ok=True)
+    n_trades = max(1, round(TRADES_PER_YEAR * scale))
+    for year in years:
+        paragraphs = []
+        for _ in range(n_trades):
+            paragraphs.append(trade_paragraph(rng, year, llm_share))
+            paragraphs.extend(other_paragraph(rng, year) for _ in range(OTHER_PARAGRAPHS_PER_TRADE))
+        items = "\n".join(f"<li><p>{p}</p></li>" for p in paragraphs)
+        page = (f"<html><head><title>{year} NBA Transactions</title></head><body>"
+                f'<div id="content"><ul class="page_index">\n{items}\n</ul></div></body></html>\n')
+        (Path(html_dir) / f"{year}.html").write_text(page, encoding="utf-8")
+    return n_trades * len(years)
+
+
+def generate_workspace(out_dir, seasons=len(CTG_YEARS), scale=1.0, leagues=1, llm_share=0.2, seed=SYNTHETIC_SEED):
+    """
+    Everything the stages read, laid out as in the repo root: CTG_CSV_Data/,
+    playoff_teams.json, conf_finals_teams.json and bbref_htmls/. Returns
+    counts of what was generated.
+    """
+    out_dir = Path(out_dir)
+    labels = generate_ctg_exports(out_dir / CTG_CSV_DIR, seasons, scale, leagues, seed)
+    write_label_files(labels, out_dir)
+    n_trades = generate_trade_htmls(out_dir / "bbref_htmls", scale=scale, llm_share=llm_share, seed=seed)
+    per_team = max(1, round(PLAYERS_PER_TEAM * scale))
+    return {
+        'seasons': seasons,
+        'teams': len(synthetic_teams(leagues)),
+        'player_seasons': seasons * per_team * len(synthetic_teams(leagues)),
+        'trades': n_trades,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate CTG exports, team lists and bbref pages with the real layout at any scale")
+    parser.add_argument('out', help='directory to lay the data out in, as in the repo root')
+    parser.add_argument('--scale', type=float, default=1.0, help='players per team and trades per year, relative to the real data')
+    parser.add_argument('--seasons', type=int, default=len(CTG_YEARS), help='seasons from 2003-04 on')
+    parser.add_argument('--leagues', type=int, default=1, help='groups of 30 teams')
+    parser.add_argument('--llm-share', type=float, default=0.2, help='share of trades with a clause the rule parser cannot resolve')
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_SEED)
+    args = parser.parse_args()
+    counts = generate_workspace(args.out, args.seasons, args.scale, args.leagues, args.llm_share, args.seed)
+    print(f"Generated {counts['player_seasons']} regular-season player-seasons ({counts['seasons']} seasons, "
+          f"{counts['teams']} teams) and {counts['trades']} trades in {args.out}")
@@ -0,0 +1,92 @@
+import shutil
+from pathlib import Path
+import pytest
+from ctg_data import CTG_CATEGORIES, CTG_SEASON_PHASES, CTGManifest, ctg_path, season_label
+from ctg_http import fetch_all, fetch_export, make_session, serve_fixtures
+
+YEAR = 2010
+# the site has no export for this one, so the stand-in answers 404
+MISSING = (YEAR, "Playoffs", next(iter(CTG_CATEGORIES)))
+COOKIE = "sessionid=test"
+# a season from the checked-in data, served as-is
+REAL_YEAR = 2022
+REAL_SEASON = Path(__file__).parent / "CTG_CSV_Data" / season_label(REAL_YEAR)
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A fixture tree with every export of YEAR but MISSING, served over HTTP"""
+    source = tmp_path / "site"
+    for phase in CTG_SEASON_PHASES:
+        for category_name in CTG_CATEGORIES:
+            if (YEAR, phase, category_name) == MISSING:
+                continue
+            path = ctg_path(YEAR, phase, category_name, source)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"Player,Team\nA {category_name},BOS\n")
+    server, url = serve_fixtures(source, required_cookie=COOKIE)
+    yield source, url
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_then_revalidate(site, tmp_path):
+    source, url = site
+    root = tmp_path / "out"
+    session = make_session(cookie=COOKIE)
+    n_exports = len(CTG_SEASON_PHASES) * len(CTG_CATEGORIES) - 1
+
+    assert fetch_all([YEAR], url=url, root=root, workers=2, session=session) == {"fetched": n_exports, "missing": 1}
+    for path in source.rglob("*.csv"):
+        assert (root / path.relative_to(source)).read_bytes() == path.read_bytes()
+    manifest = CTGManifest(root)
+    assert manifest.is_known_empty(ctg_path(*MISSING, root=root))
+    assert all("etag" in entry for entry in manifest.entries.values() if entry["status"] == "ok")
+
+    assert fetch_all([YEAR], url=url, root=root, workers=2, session=session) == {"known empty": 1, "skipped": n_exports}
+    assert fetch_all([YEAR], url=url, root=root, workers=2, session=session, refresh=True) == {
+        "known empty": 1, "not modified": n_exports}
+
+
+def test_login_page_is_an_error(site, tmp_path):
+    _, url = site
+    root = tmp_path / "out"
+    job = (YEAR, "Regular Season", next(iter(CTG_CATEGORIES)))
+    with pytest.raises(PermissionError):
+        fetch_export(make_session(cookie=""), *job, CTGManifest(root), url, root)
+    assert not ctg_path(*job, root=root).exists()
+
+    # fetch_all reports it and keeps going rather than writing the login page as a CSV
+    counts = fetch_all([YEAR], url=url, root=root, workers=2, session=make_session(cookie=""))
+    assert counts == {"failed": len(CTG_SEASON_PHASES) * len(CTG_CATEGORIES)}
+    assert not list(root.rglob("*.csv"))
+    assert not CTGManifest(root).entries
+
+
+@pytest.mark.skipif(not REAL_SEASON.is_dir(), reason=f"{REAL_SEASON} not checked out")
+def test_real_season_round_trip(tmp_path):
+    source = tmp_path / "site"
+    shutil.copytree(REAL_SEASON, source / REAL_SEASON.name, ignore=shutil.ignore_patterns("manifest.json"))
+    served = {path.name: path.read_bytes() for path in (source / REAL_SEASON.name).glob("*.csv")}
+    server, url = serve_fixtures(source, required_cookie=COOKIE)
+    try:
+        root = tmp_path / "out"
+        session = make_session(cookie=COOKIE)
+        n_missing = len(CTG_SEASON_PHASES) * len(CTG_CATEGORIES) - len(served)
+        expected = {status: n for status, n in (("fetched", len(served)), ("missing", n_missing)) if n}
+        assert fetch_all([REAL_YEAR], url=url, root=root, workers=2, session=session) == expected
+
+        # every export lands under the name the pipeline reads, byte for byte
+        fetched = {path.name: path for path in (root / REAL_SEASON.name).glob("*.csv")}
+        assert fetched.keys() == served.keys()
+        assert fetched.keys() <= {ctg_path(REAL_YEAR, phase, name, root).name for phase in CTG_SEASON_PHASES for name in CTG_CATEGORIES}
+        assert all(path.read_bytes() == served[name] for name, path in fetched.items())
+
+        # revalidating gets 304s and leaves the files alone
+        stats = {name: path.stat().st_mtime_ns for name, path in fetched.items()}
+        expected = {status: n for status, n in (("not modified", len(served)), ("known empty", n_missing)) if n}
+        assert fetch_all([REAL_YEAR], url=url, root=root, workers=2, session=session, refresh=True) == expected
+        assert all(path.read_bytes() == served[name] and path.stat().st_mtime_ns == stats[name] for name, path in fetched.items())
+    finally:
+        server.shutdown()
+        server.server_close()
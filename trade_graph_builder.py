@@ -1,25 +1,53 @@
 import pandas as pd
-import json, re, os, logging
+import json, re, os, logging, time, argparse, threading
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, Counter
 import ollama
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from pydantic import BaseModel
-from typing import Literal
+from typing import Literal, NamedTuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import tempfile
+from llm_cache import ClauseCache, cache_key
+from instrumentation import WORKER_CONTEXT, METRICS, reset_worker_metrics, timed, count, observe, profiled, write_report
+from trade_store import TRADE_STORE_PATH, CHECKPOINT_DIR, trade_transfers, write_trade_store, load_trade_rows, rows_to_trades, load_checkpoints
 
 load_dotenv()
 MODEL = "qwen2.5:3b"  
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 4))  # match OLLAMA_NUM_PARALLEL on the server
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 120))  # seconds per request
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", 2))
+LLM_RETRY_BACKOFF = 2.0
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+_client = None
+_cache = None
+_init_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_parse_path_counts = Counter()
 LOG_FILE = "trade_parser.log"
-os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True) if os.path.dirname(LOG_FILE) else None
+_log_handler = None
 
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    filemode='w',  # overwrite each run
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+def setup_logging(filemode='w'):
+    """
+    Send the parser's logging to LOG_FILE. Called by the trades entry points
+    rather than on import, so importing this module leaves the root logger
+    alone; calling it again replaces the handler it added last time.
+    """
+    global _log_handler
+    if os.path.dirname(LOG_FILE):
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    root = logging.getLogger()
+    if _log_handler is not None:
+        root.removeHandler(_log_handler)
+        _log_handler.close()
+    _log_handler = logging.FileHandler(LOG_FILE, mode=filemode, encoding='utf-8')
+    _log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    root.addHandler(_log_handler)
+    root.setLevel(logging.INFO)
 
 
 # ============================================================================
@@ -142,131 +170,382 @@ EXAMPLES:
 Return JSON only."""
 
 
-def parse_trade_step1(trade_text: str) -> TransferList:
-    """
-    Step 1: Extract primitive A->B transfers from the trade text.
-    Parse each clause individually for better accuracy.
-    """
+def get_client() -> ollama.Client:
+    """Shared client; httpx connection pool is safe to use from worker threads"""
+    global _client
+    with _init_lock:
+        if _client is None:
+            _client = ollama.Client(timeout=LLM_TIMEOUT)
+    return _client
+
+
+def get_cache() -> ClauseCache:
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            _cache = ClauseCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def clause_cache_key(clause: str) -> str:
+    """Anything that can change the model's answer is part of the key"""
+    normalized = ' '.join(clause.split())
+    schema = json.dumps(TransferList.model_json_schema(), sort_keys=True)
+    return cache_key(normalized, SYSTEM_PROMPT, MODEL, schema)
+
+
+def chat_with_retries(messages: list[dict]) -> dict:
+    """ollama.chat with a per-request timeout and exponential backoff between retries"""
+    for attempt in range(LLM_RETRIES + 1):
+        try:
+            return get_client().chat(
+                messages=messages,
+                model=MODEL,
+                format=TransferList.model_json_schema(),
+                options={
+                    'num_thread': 6,      # Use CPU cores
+                    'temperature': 0,     # Deterministic
+                }
+            )
+        except Exception as e:
+            if attempt == LLM_RETRIES:
+                raise
+            logging.warning(f"LLM request failed ({e}), retry {attempt + 1}/{LLM_RETRIES}")
+            time.sleep(LLM_RETRY_BACKOFF * 2 ** attempt)
+
+
+@timed('trades.parse_clause')
+def parse_clause(clause: str) -> list[SimpleTransfer]:
+    """Send a single preprocessed clause to the LLM and return its validated, normalized transfers"""
+    clause = clause.encode('utf-8', errors='ignore').decode('utf-8')
+
+    user_prompt = f"Parse this clause into transfers:\n{clause}"
     
-    # Preprocess to isolate clauses
-    clauses = preprocess_trade_text(trade_text)
-    all_transfers = [] 
+    messages = [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': user_prompt}
+    ]
     
-    # Parse each clause individually
-    for clause in clauses:
-        clause = clause.encode('utf-8', errors='ignore').decode('utf-8')
-
-        user_prompt = f"Parse this clause into transfers:\n{clause}"
-        
-        messages = [
-            {'role': 'system', 'content': SYSTEM_PROMPT},
-            {'role': 'user', 'content': user_prompt}
-        ]
+    rule_transfers = parse_clause_with_rules(clause)
+    if rule_transfers is not None:
+        record_parse_path('rules')
+        transfer_list = TransferList(transfers=rule_transfers)
+    else:
+        key = clause_cache_key(clause)
+        cached = get_cache().get(key)
+        if cached is not None:
+            record_parse_path('cache')
+            transfer_list = TransferList.model_validate_json(cached)
+        else:
+            record_parse_path('llm')
+            start = time.perf_counter()
+            response = chat_with_retries(messages)
+            observe('trades.llm_latency_s', time.perf_counter() - start)
+            # ollama reports generated tokens and generation time (ns) with every response
+            if response.get('eval_count') and response.get('eval_duration'):
+                count('trades.llm_eval_tokens', response['eval_count'])
+                observe('trades.llm_tokens_per_s', response['eval_count'] / (response['eval_duration'] / 1e9))
+
+            transfer_list = TransferList.model_validate_json(response['message']['content'])
+            get_cache().put(key, transfer_list.model_dump_json(exclude_none=True))
+    
+    # Validate and fix common errors
+    valid_transfers = []
+    for transfer in transfer_list.transfers:
+        # Fix type errors
+        if transfer.asset.type == "draft_pick":
+            transfer.asset.type = "pick"
         
-        response = ollama.chat(
-            messages=messages,
-            model=MODEL,
-            format=TransferList.model_json_schema(),
-            options={
-                'num_thread': 6,      # Use CPU cores
-                'temperature': 0,     # Deterministic
-            }
-        )
-
-        transfer_list = TransferList.model_validate_json(response['message']['content'])
+        # Skip if type is still invalid
+        if transfer.asset.type not in ["player", "pick", "cash"]:
+            logging.warning(f"Invalid asset type: {transfer.asset.type}, skipping")
+            continue
         
-        # Validate and fix common errors
-        valid_transfers = []
-        for transfer in transfer_list.transfers:
-            # Fix type errors
-            if transfer.asset.type == "draft_pick":
-                transfer.asset.type = "pick"
-            
-            # Skip if type is still invalid
-            if transfer.asset.type not in ["player", "pick", "cash"]:
-                logging.warning(f"Invalid asset type: {transfer.asset.type}, skipping")
-                continue
-            
-            # Fix year format errors for picks
-            if transfer.asset.type == "pick":
-                if transfer.asset.year:
-                    # Extract just the year number (4 digits)
-                    year_match = re.search(r'(\d{4})', str(transfer.asset.year))
-                    if year_match:
-                        transfer.asset.year = year_match.group(1)
-                    else:
-                        logging.warning(f"Bad year format: {transfer.asset.year}, skipping transfer")
-                        continue
-                
-                # Ensure round is 1 or 2
-                if transfer.asset.round not in [1, 2]:
-                    logging.warning(f"Invalid round: {transfer.asset.round}, skipping transfer")
+        # Fix year format errors for picks
+        if transfer.asset.type == "pick":
+            if transfer.asset.year:
+                # Extract just the year number (4 digits)
+                year_match = re.search(r'(\d{4})', str(transfer.asset.year))
+                if year_match:
+                    transfer.asset.year = year_match.group(1)
+                else:
+                    logging.warning(f"Bad year format: {transfer.asset.year}, skipping transfer")
                     continue
             
-            valid_transfers.append(transfer)
-        
-        transfer_list.transfers = valid_transfers
-               
-        # Normalize team names immediately after parsing
-        for transfer in transfer_list.transfers:
-            transfer.from_team = normalize_team_name(transfer.from_team)
-            transfer.to_team = normalize_team_name(transfer.to_team)
-            if transfer.asset.team:
-                transfer.asset.team = normalize_team_name(transfer.asset.team)
-            # Default pick ownership to from_team if not specified
-            elif transfer.asset.type == "pick" and not transfer.asset.team:
-                transfer.asset.team = transfer.from_team
+            # Ensure round is 1 or 2
+            if transfer.asset.round not in [1, 2]:
+                logging.warning(f"Invalid round: {transfer.asset.round}, skipping transfer")
+                continue
         
-        all_transfers.extend(transfer_list.transfers)
+        valid_transfers.append(transfer)
+           
+    # Normalize team names immediately after parsing
+    for transfer in valid_transfers:
+        transfer.from_team = normalize_team_name(transfer.from_team)
+        transfer.to_team = normalize_team_name(transfer.to_team)
+        if transfer.asset.team:
+            transfer.asset.team = normalize_team_name(transfer.asset.team)
+        # Default pick ownership to from_team if not specified
+        elif transfer.asset.type == "pick" and not transfer.asset.team:
+            transfer.asset.team = transfer.from_team
     
-    # Return combined transfer list
-    return TransferList(transfers=all_transfers)
+    return valid_transfers
+
+
+TEAM_ABBREVIATIONS = {
+    # Current teams
+    "atlanta hawks": "ATL",
+    "boston celtics": "BOS",
+    "brooklyn nets": "BKN",
+    "new jersey nets": "BKN",
+    "charlotte hornets": "CHA",
+    "charlotte bobcats": "CHA",
+    "chicago bulls": "CHI",
+    "cleveland cavaliers": "CLE",
+    "dallas mavericks": "DAL",
+    "denver nuggets": "DEN",
+    "detroit pistons": "DET",
+    "golden state warriors": "GSW",
+    "houston rockets": "HOU",
+    "indiana pacers": "IND",
+    "los angeles clippers": "LAC",
+    "los angeles lakers": "LAL",
+    "memphis grizzlies": "MEM",
+    "miami heat": "MIA",
+    "milwaukee bucks": "MIL",
+    "minnesota timberwolves": "MIN",
+    "new orleans pelicans": "NOP",
+    "new orleans hornets": "NOP",
+    "new orleans/oklahoma city hornets": "NOP",
+    "new york knicks": "NYK",
+    "oklahoma city thunder": "OKC",
+    "seattle supersonics": "OKC",
+    "orlando magic": "ORL",
+    "philadelphia 76ers": "PHI",
+    "phoenix suns": "PHX",
+    "portland trail blazers": "POR",
+    "sacramento kings": "SAC",
+    "san antonio spurs": "SAS",
+    "toronto raptors": "TOR",
+    "utah jazz": "UTA",
+    "washington wizards": "WAS",
+    "washington bullets": "WAS",
+}
 
 
 def normalize_team_name(team_name: str) -> str:
     """Convert full team names to 3-letter NBA abbreviations"""
-    mapping = {
-        # Current teams
-        "atlanta hawks": "ATL",
-        "boston celtics": "BOS",
-        "brooklyn nets": "BKN",
-        "new jersey nets": "BKN",
-        "charlotte hornets": "CHA",
-        "charlotte bobcats": "CHA",
-        "chicago bulls": "CHI",
-        "cleveland cavaliers": "CLE",
-        "dallas mavericks": "DAL",
-        "denver nuggets": "DEN",
-        "detroit pistons": "DET",
-        "golden state warriors": "GSW",
-        "houston rockets": "HOU",
-        "indiana pacers": "IND",
-        "los angeles clippers": "LAC",
-        "los angeles lakers": "LAL",
-        "memphis grizzlies": "MEM",
-        "miami heat": "MIA",
-        "milwaukee bucks": "MIL",
-        "minnesota timberwolves": "MIN",
-        "new orleans pelicans": "NOP",
-        "new orleans hornets": "NOP",
-        "new orleans/oklahoma city hornets": "NOP",
-        "new york knicks": "NYK",
-        "oklahoma city thunder": "OKC",
-        "seattle supersonics": "OKC",
-        "orlando magic": "ORL",
-        "philadelphia 76ers": "PHI",
-        "phoenix suns": "PHX",
-        "portland trail blazers": "POR",
-        "sacramento kings": "SAC",
-        "san antonio spurs": "SAS",
-        "toronto raptors": "TOR",
-        "utah jazz": "UTA",
-        "washington wizards": "WAS",
-        "washington bullets": "WAS",
-    }
-    
     key = team_name.lower().strip()
-    return mapping.get(key, team_name.upper()[:3])
+    return TEAM_ABBREVIATIONS.get(key, team_name.upper()[:3])
+
+
+# ============================================================================
+# RULE-BASED FAST PATH
+# ============================================================================
+
+# bbref codes that show up in pick ownership notes ("2028 2nd-rd pick is DAL own")
+BBREF_TEAM_CODES = {"BRK": "BKN", "NJN": "BKN", "CHO": "CHA", "PHO": "PHX", "NOH": "NOP", "NOK": "NOP", "SEA": "OKC"}
+NAME_PARTICLES = {"a", "van", "der", "de", "da", "la", "le", "di", "del", "von", "st."}
+
+_TEAM_PATTERN = '|'.join(re.escape(name) for name in sorted(TEAM_ABBREVIATIONS, key=len, reverse=True))
+CLAUSE_RE = re.compile(
+    rf"^(?:and\s+)?the\s+(?P<from_team>{_TEAM_PATTERN})\s+traded\s+(?P<sent>.+?)"
+    rf"\s+to\s+the\s+(?P<to_team>{_TEAM_PATTERN})(?:\s+for\s+(?P<received>.+))?$",
+    flags=re.IGNORECASE
+)
+ASSET_SPLIT_RE = re.compile(r"\s*,\s*(?:and\s+)?|\s+and\s+")
+PICK_RE = re.compile(r"^(?:a\s+)?(?P<year>\d{4})\s+(?P<round>1st|2nd)\s+round\s+draft\s+pick$")
+OWNER_NOTE_RE = re.compile(r"^(?P<year>\d{4})\s+(?P<round>1st|2nd)-rd\s+pick\s+is\s+(?P<team>[A-Z]{3})\s+own$")
+NOTES_SPLIT_RE = re.compile(r"\.\s+(?=\d{4}\s+(?:1st|2nd)-rd\s+pick\b)")
+_OWNER_NOTE_SPLIT_RE = re.compile(r"\s+(?=\d{4}\s+(?:1st|2nd)-rd\s+pick\b)")
+
+
+def looks_like_player_name(text: str) -> bool:
+    tokens = text.split()
+    if not 2 <= len(tokens) <= 5:
+        return False
+    for token in tokens:
+        if token.lower() in NAME_PARTICLES:
+            continue
+        if not token[0].isupper() or not all(ch.isalpha() or ch in ".'-" for ch in token):
+            return False
+    return True
+
+
+def parse_asset_list(text: str, from_team: str, owners: dict) -> list[Asset] | None:
+    assets = []
+    for part in ASSET_SPLIT_RE.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        pick_match = PICK_RE.match(part)
+        if part.lower() == "cash":
+            assets.append(Asset(type="cash"))
+        elif pick_match:
+            year, rnd = pick_match.group("year"), int(pick_match.group("round")[0])
+            assets.append(Asset(type="pick", year=year, round=rnd, team=owners.get((year, rnd), from_team)))
+        elif looks_like_player_name(part):
+            assets.append(Asset(type="player", name=part))
+        else:
+            return None
+    return assets or None
+
+
+def parse_pick_owner_notes(notes: list[str]) -> dict | None:
+    """{(year, round): team} from bbref's trailing ownership notes, None if any note is something else"""
+    owners = {}
+    for note in notes:
+        for part in _OWNER_NOTE_SPLIT_RE.split(note.strip()):
+            match = OWNER_NOTE_RE.match(part.strip())
+            if not match:
+                return None
+            key = (match.group("year"), int(match.group("round")[0]))
+            if key in owners:
+                return None
+            owners[key] = BBREF_TEAM_CODES.get(match.group("team"), match.group("team"))
+    return owners
+
+
+def parse_clause_with_rules(clause: str) -> list[SimpleTransfer] | None:
+    """
+    Resolve the plain "X traded A to Y (for B)" clauses without the LLM.
+    Returns None whenever anything in the clause is not fully understood.
+    """
+    # initials like "R. J. Barrett" also contain ". ", so only split where a pick note starts
+    sentences = NOTES_SPLIT_RE.split(clause.strip(), maxsplit=1)
+    owners = parse_pick_owner_notes(sentences[1:])
+    if owners is None:
+        return None
+    
+    match = CLAUSE_RE.match(sentences[0].strip())
+    if not match:
+        return None
+    from_team, to_team = match.group("from_team"), match.group("to_team")
+    if normalize_team_name(from_team) == normalize_team_name(to_team):
+        return None
+    
+    sent = parse_asset_list(match.group("sent"), from_team, owners)
+    if sent is None:
+        return None
+    received = []
+    if match.group("received"):
+        received = parse_asset_list(match.group("received"), to_team, owners)
+        if received is None:
+            return None
+    
+    return (
+        [SimpleTransfer(from_team=from_team, to_team=to_team, asset=asset) for asset in sent] +
+        [SimpleTransfer(from_team=to_team, to_team=from_team, asset=asset) for asset in received]
+    )
+
+
+def record_parse_path(path: str):
+    with _stats_lock:
+        _parse_path_counts[path] += 1
+    count(f'trades.clause_path.{path}')
+
+
+def parse_path_report() -> dict:
+    """How many clauses were resolved by the rules, the cache and the LLM"""
+    with _stats_lock:
+        counts = dict(_parse_path_counts)
+    total = sum(counts.values())
+    return {path: {'clauses': n, 'fraction': n / total if total else 0.0} for path, n in sorted(counts.items())}
+
+
+def log_parse_path_report():
+    for path, entry in parse_path_report().items():
+        logging.info(f"Clause path {path}: {entry['clauses']} ({entry['fraction']:.1%})")
+
+
+def rule_coverage(years=range(2004, 2025)) -> dict:
+    """Dry run of the fast path over the bbref pages: fraction of clauses it resolves without the model"""
+    resolved = total = 0
+    for year in years:
+        html_file = f"bbref_htmls/{year}.html"
+        if not os.path.exists(html_file):
+            continue
+        for trade_text in iter_trade_texts(html_file):
+            for clause in preprocess_trade_text(trade_text):
+                total += 1
+                resolved += parse_clause_with_rules(clause) is not None
+    return {'clauses': total, 'rules': resolved, 'fraction': resolved / total if total else 0.0}
+
+
+# ============================================================================
+# HTML EXTRACTION
+# ============================================================================
+
+HTML_CHUNK_SIZE = 64 * 1024
+
+
+def iter_paragraphs_soup(html_file: str):
+    """Original path: full BeautifulSoup tree, then every <p>"""
+    with open(html_file, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    for p_tag in soup.find_all('p'):
+        yield p_tag.get_text()
+
+
+class ParagraphStreamParser(HTMLParser):
+    """SAX-style <p> collector; completed paragraphs pile up in .paragraphs until drained"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.parts = []
+        self.paragraphs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'p':
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'p' and self.depth:
+            self.depth -= 1
+            if self.depth == 0:
+                self.paragraphs.append(''.join(self.parts))
+                self.parts = []
+
+    def handle_data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+
+def iter_paragraphs_sax(html_file: str):
+    """Stdlib html.parser fed in chunks; paragraphs are yielded as soon as their </p> is read"""
+    parser = ParagraphStreamParser()
+    with open(html_file, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(HTML_CHUNK_SIZE), ''):
+            parser.feed(chunk)
+            yield from parser.paragraphs
+            parser.paragraphs.clear()
+    parser.close()
+    yield from parser.paragraphs
+
+
+def iter_paragraphs_lxml(html_file: str):
+    """lxml iterparse over <p> end events, clearing each element once read"""
+    from lxml import etree
+    for _, element in etree.iterparse(html_file, events=('end',), tag='p', html=True, encoding='utf-8'):
+        yield ''.join(element.itertext())
+        element.clear(keep_tail=True)
+
+
+HTML_BACKENDS = {
+    'soup': iter_paragraphs_soup,
+    'sax': iter_paragraphs_sax,
+    'lxml': iter_paragraphs_lxml,
+}
+DEFAULT_HTML_BACKEND = os.getenv("TRADE_HTML_BACKEND", "sax")
+
+
+def iter_trade_texts(html_file: str, backend: str = DEFAULT_HTML_BACKEND):
+    """Cleaned, whitespace-collapsed trade paragraphs from a bbref transactions page"""
+    for text in HTML_BACKENDS[backend](html_file):
+        trade_text = ' '.join(text.split())
+        if is_actual_trade(trade_text):
+            yield trade_text
 
 
 def aggregate_transfers(transfers: list[SimpleTransfer]) -> Trade:
@@ -331,36 +610,276 @@ def is_actual_trade(text: str) -> bool:
     return "traded" in text.lower()
 
 
-def parse_trade(trade_text: str) -> str:
+def build_trade(transfer_list: TransferList, trade_text: str) -> str:
+    """Aggregate a trade's clause transfers into a team view and validate it"""
+    logging.debug(f"Got {len(transfer_list.transfers)} transfers from LLM")
+    
+    # Step 2: Pure Python aggregation
+    trade = aggregate_transfers(transfer_list.transfers)
+    
+    # Step 3: Validate
+    if not validate_trade(trade):
+        logging.warning(f"⚠️  Trade validation failed (empty): {trade_text[:80]}...")
+        return None
+    
+    return trade.model_dump_json(indent=2)
+
+
+def parse_trades(trade_texts, max_workers: int = LLM_CONCURRENCY) -> list[str]:
     """
-    Two-step parsing:
-    Step 1: Extract primitive transfers (LLM)
-    Step 2: Aggregate into team view (Python)
+    Parse many trades into team-view JSON (None for a trade that failed).
+    Every clause of every trade goes through one bounded worker pool so the
+    model server always has work queued; results come back in input order.
+    trade_texts may be a generator, clauses are submitted as it yields.
     """
-    try:
-        # Step 1: Let the LLM do simple extraction
-        transfer_list = parse_trade_step1(trade_text)
-
-        logging.debug(f"Got {len(transfer_list.transfers)} transfers from LLM")
-        
-        # Step 2: Pure Python aggregation
-        trade = aggregate_transfers(transfer_list.transfers)
+    results = []
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        submitted = [
+            (trade_text, [pool.submit(parse_clause, clause) for clause in preprocess_trade_text(trade_text)])
+            for trade_text in trade_texts
+        ]
         
-        # Step 3: Validate
-        if not validate_trade(trade):
-            logging.warning(f"⚠️  Trade validation failed (empty): {trade_text[:80]}...")
-            return None
+        for trade_text, futures in submitted:
+            try:
+                # waiting on the trade's clauses plus its assembly; the clauses themselves are trades.parse_clause
+                with timed('trades.parse_trade'):
+                    transfers = [transfer for future in futures for transfer in future.result()]
+                    results.append(build_trade(TransferList(transfers=transfers), trade_text))
+            except Exception as e:
+                logging.error(f"Error parsing trade: {e}")
+                logging.error(f"Trade text: {trade_text[:80]}...")
+                results.append(None)
+    
+    return results
+
+
+# ============================================================================
+# TRADE GRAPH
+# ============================================================================
+
+class TradeEdge(NamedTuple):
+    """One asset moving from one team to another inside a trade"""
+    trade_id: str
+    season: int
+    order: int  # position of the trade on its season's page, pages are chronological
+    from_team: str
+    to_team: str
+    asset: tuple  # ("player", name) | ("pick", year, round, team) | ("cash",)
+
+
+def asset_key(asset: dict) -> tuple:
+    if asset["type"] == "player":
+        return ("player", asset.get("name"))
+    if asset["type"] == "pick":
+        return ("pick", str(asset.get("year")), asset.get("round"), asset.get("team"))
+    return ("cash",)
+
+
+class TradeGraph:
+    """
+    Directed multigraph of teams with one edge per transferred asset.
+    Edges are indexed by team, season, player and pick so lookups never
+    rescan the trade JSON.
+    """
+
+    def __init__(self):
+        self.edges: list[TradeEdge] = []
+        self.trades: dict[str, list[int]] = {}
+        self.trade_teams: dict[str, list[str]] = {}
+        self.out_edges = defaultdict(list)   # team -> edge ids it sent
+        self.in_edges = defaultdict(list)    # team -> edge ids it acquired
+        self.by_season = defaultdict(list)   # season -> trade ids
+        self.by_team = defaultdict(list)     # team -> trade ids
+        self.by_team_season = defaultdict(list)  # (team, season) -> trade ids
+        self.by_asset = defaultdict(list)    # asset key -> edge ids, chronological
+        self.by_player = defaultdict(list)   # player name -> edge ids
+        self.by_pick = defaultdict(list)     # (year, round, original team) -> edge ids
+        self.pair_counts = Counter()         # (from_team, to_team) -> assets moved
+        self.unmatched_assets = 0
+
+    @classmethod
+    def from_trades(cls, trades_by_season: dict) -> "TradeGraph":
+        graph = cls()
+        for season in sorted(trades_by_season, key=int):
+            for order, trade in enumerate(trades_by_season[season]):
+                graph.add_trade(f"{season}-{order}", int(season), order, trade)
+        return graph
+
+    @classmethod
+    def from_checkpoints(cls, checkpoint_dir: str = CHECKPOINT_DIR) -> "TradeGraph":
+        return cls.from_trades(load_checkpoints(checkpoint_dir))
+
+    @classmethod
+    def from_store(cls, path: str = TRADE_STORE_PATH, seasons=None) -> "TradeGraph":
+        return cls.from_trades(rows_to_trades(load_trade_rows(path, seasons=seasons)))
+
+    def add_trade(self, trade_id: str, season: int, order: int, trade: dict):
+        edge_ids = []
+        for from_team, to_team, asset in trade_transfers(trade):
+            if from_team is None or to_team is None:
+                self.unmatched_assets += 1
+                continue
+            edge_ids.append(self._add_edge(TradeEdge(trade_id, season, order, from_team, to_team, asset_key(asset))))
         
-        return trade.model_dump_json(indent=2)
-    except Exception as e:
-        logging.error(f"Error parsing trade: {e}")
-        logging.error(f"Trade text: {trade_text[:80]}...")
+        teams = [team["team"] for team in trade["teams"]]
+        self.trades[trade_id] = edge_ids
+        self.trade_teams[trade_id] = teams
+        self.by_season[season].append(trade_id)
+        for team in teams:
+            self.by_team[team].append(trade_id)
+            self.by_team_season[(team, season)].append(trade_id)
+
+    def _add_edge(self, edge: TradeEdge) -> int:
+        edge_id = len(self.edges)
+        self.edges.append(edge)
+        self.out_edges[edge.from_team].append(edge_id)
+        self.in_edges[edge.to_team].append(edge_id)
+        self.by_asset[edge.asset].append(edge_id)
+        if edge.asset[0] == "player":
+            self.by_player[edge.asset[1]].append(edge_id)
+        elif edge.asset[0] == "pick":
+            self.by_pick[edge.asset[1:]].append(edge_id)
+        self.pair_counts[(edge.from_team, edge.to_team)] += 1
+        return edge_id
+
+    def asset_chain(self, key: tuple) -> list[TradeEdge]:
+        """Every hop an asset took, oldest first"""
+        return [self.edges[i] for i in self.by_asset.get(key, [])]
+
+    def pick_chain(self, year, round: int, team: str) -> list[TradeEdge]:
+        """Where did this pick go: ("2028", 2, "DAL") -> DAL -> ... -> current holder"""
+        return [self.edges[i] for i in self.by_pick.get((str(year), round, team), [])]
+
+    def player_chain(self, name: str) -> list[TradeEdge]:
+        return [self.edges[i] for i in self.by_player.get(name, [])]
+
+    def edge_count(self, from_team: str, to_team: str) -> int:
+        """Assets moved from one team to another across all trades"""
+        return self.pair_counts[(from_team, to_team)]
+
+    def trade_partners(self, team: str, season: int = None) -> Counter:
+        """Number of trades a team made with each other team, optionally within a season"""
+        if season is None:
+            trade_ids = self.by_team.get(team, [])
+        else:
+            trade_ids = self.by_team_season.get((team, season), [])
+        partners = Counter()
+        for trade_id in trade_ids:
+            partners.update(t for t in self.trade_teams[trade_id] if t != team)
+        return partners
+
+    def trades_between(self, team_a: str, team_b: str, season: int = None) -> list[str]:
+        trade_ids = self.by_team.get(team_a, []) if season is None else self.by_team_season.get((team_a, season), [])
+        return [trade_id for trade_id in trade_ids if team_b in self.trade_teams[trade_id]]
+
+    def trade_tree(self, trade_id: str, team: str, max_depth: int = 10) -> dict:
+        """
+        What a team turned a trade into: every asset it acquired, and for each
+        one, the later trade it was flipped in (recursively).
+        """
+        season, order = self._position(trade_id)
+        node = {"trade_id": trade_id, "team": team, "acquired": []}
+        for edge_id in self.trades[trade_id]:
+            edge = self.edges[edge_id]
+            if edge.to_team != team:
+                continue
+            branch = {"asset": edge.asset, "next": None}
+            if max_depth > 0:
+                flipped = self._next_departure(edge.asset, team, season, order)
+                if flipped is not None:
+                    branch["next"] = self.trade_tree(flipped.trade_id, team, max_depth - 1)
+            node["acquired"].append(branch)
+        return node
+
+    def _position(self, trade_id: str) -> tuple:
+        season, order = trade_id.split("-")
+        return int(season), int(order)
+
+    def _next_departure(self, key: tuple, team: str, season: int, order: int):
+        for edge_id in self.by_asset.get(key, []):
+            edge = self.edges[edge_id]
+            if edge.from_team == team and (edge.season, edge.order) > (season, order):
+                return edge
         return None
 
 
-def parse_trade_htmls():
+def write_json_atomic(path: str, data):
+    """Write to a temp file in the same directory, then rename over path, so readers never see a partial file"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@timed('trades.parse_year')
+def parse_year(year: int, max_workers: int = LLM_CONCURRENCY, html_backend: str = DEFAULT_HTML_BACKEND) -> list[dict]:
+    """Parse one bbref page and checkpoint it; years without a page get no checkpoint"""
+    html_file = f"bbref_htmls/{year}.html"
+    
+    if not os.path.exists(html_file):
+        return []
+        
+    trade_texts = iter_trade_texts(html_file, html_backend)
+    trades = [json.loads(parsed) for parsed in parse_trades(trade_texts, max_workers) if parsed]
+    
+    # Save individual year checkpoint
+    write_json_atomic(f"{CHECKPOINT_DIR}/{year}.json", trades)
+    return trades
+
+
+def _parse_year_in_worker(year: int, max_workers: int, html_backend: str) -> tuple:
+    """Process pool entry point; hands this year's path and cache counters back to the parent"""
+    # the parent truncated the log when the run started; workers append to it
+    setup_logging('a')
+    # pool processes are reused across years, so report deltas rather than running totals
+    cache = get_cache()
+    with _stats_lock:
+        paths_before = Counter(_parse_path_counts)
+    hits_before, misses_before = cache.hits, cache.misses
+    
+    trades = parse_year(year, max_workers, html_backend)
+    
+    with _stats_lock:
+        path_counts = dict(_parse_path_counts - paths_before)
+    return len(trades), path_counts, cache.hits - hits_before, cache.misses - misses_before, METRICS.drain()
+
+
+def parse_years_in_processes(years: list[int], processes: int, max_workers: int, html_backend: str):
+    """
+    Parse independent years concurrently, one process per year.
+    Each worker writes its own checkpoint; parse_trade_htmls assembles them afterwards.
+    """
+    logging.info(f"Parsing {len(years)} year(s) across {processes} processes: {years}")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=WORKER_CONTEXT, initializer=reset_worker_metrics) as pool:
+        futures = {pool.submit(_parse_year_in_worker, year, max_workers, html_backend): year for year in years}
+        for future in as_completed(futures):
+            year = futures[future]
+            try:
+                n_trades, path_counts, cache_hits, cache_misses, metrics = future.result()
+            except Exception as e:
+                # no checkpoint gets written, so the serial pass below retries this year
+                logging.error(f"Worker for {year} failed: {e}")
+                continue
+            with _stats_lock:
+                _parse_path_counts.update(path_counts)
+            get_cache().hits += cache_hits
+            get_cache().misses += cache_misses
+            METRICS.merge(metrics)
+            logging.info(f"{year} done in worker: {n_trades} trades")
+
+
+@profiled('trades.parse_trade_htmls')
+def parse_trade_htmls(max_workers: int = LLM_CONCURRENCY, html_backend: str = DEFAULT_HTML_BACKEND, processes: int = 1,
+                      export_json: bool = False):
+    setup_logging('w')  # overwrite each run
     # Checkpoint directory
-    CHECKPOINT_DIR = "trade_checkpoints"
     os.makedirs(CHECKPOINT_DIR, exist_ok=True)
     
     all_trades = {}
@@ -372,6 +891,18 @@ def parse_trade_htmls():
         range(2020, 2025),  # 2019-2023
     ]
     
+    if processes > 1:
+        pending_years = [
+            year
+            for year_range in year_ranges
+            if not os.path.exists(f"trades_{year_range.start}_{year_range.stop - 1}.json")
+            for year in year_range
+            if not os.path.exists(f"{CHECKPOINT_DIR}/{year}.json") and os.path.exists(f"bbref_htmls/{year}.html")
+        ]
+        if pending_years:
+            parse_years_in_processes(pending_years, processes, max_workers, html_backend)
+    
+    # Serial pass: loads checkpoints (including any just written by workers) and assembles ranges in year order
     for year_range in year_ranges:
         range_start = year_range.start
         range_end = year_range.stop - 1
@@ -400,47 +931,29 @@ def parse_trade_htmls():
                     range_trades[year] = json.load(f)
                 continue
             
-            html_file = f"bbref_htmls/{year}.html"
-            
-            if not os.path.exists(html_file):
-                range_trades[year] = []
-                continue
-                
-            with open(html_file, 'r', encoding='utf-8') as f:
-                html = f.read() 
-
-            soup = BeautifulSoup(html, 'html.parser')
-            trades = []
-            
-            for p_tag in soup.find_all('p'):
-                trade_text = ' '.join(p_tag.get_text().split())
-                
-                if not is_actual_trade(trade_text):
-                    continue
-                
-                parsed = parse_trade(trade_text)
-                if parsed:
-                    trades.append(json.loads(parsed))
-            
-            range_trades[year] = trades
-            
-            # Save individual year checkpoint
-            with open(year_checkpoint, "w") as f:
-                json.dump(trades, f, indent=2)
+            range_trades[year] = parse_year(year, max_workers, html_backend)
         
         # Save 5-year range checkpoint
-        with open(range_checkpoint, "w") as f:
-            json.dump(range_trades, f, indent=2)
+        if export_json:
+            write_json_atomic(range_checkpoint, range_trades)
         
         all_trades.update(range_trades)
         
         total_in_range = sum(len(trades) for trades in range_trades.values())
         logging.info(f"\n Range {range_start}-{range_end} complete: {total_in_range} trades total")
-        logging.info(f" Saved to {range_checkpoint}\n")
+        if export_json:
+            logging.info(f" Saved to {range_checkpoint}\n")
+    
+    # Save final output: the columnar store, plus the legacy JSON if asked for
+    write_trade_store(all_trades, TRADE_STORE_PATH)
+    logging.info(f"Saved {TRADE_STORE_PATH}")
+    if export_json:
+        write_json_atomic("trades.json", all_trades)
     
-    # Save final output
-    with open("trades.json", "w") as f:
-        json.dump(all_trades, f, indent=2)
+    log_parse_path_report()
+    cache_stats = get_cache().stats()
+    logging.info(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                 f"({cache_stats['hit_rate']:.1%}), {cache_stats['evictions']} evicted, {cache_stats['entries']} entries")
     
     logging.info("=" * 80)
     logging.info("🎉 ALL DONE!")
@@ -448,4 +961,18 @@ def parse_trade_htmls():
     logging.info(f"Total trades parsed: {total_trades}")
 
 if __name__ == "__main__":
-    parse_trade_htmls()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=LLM_CONCURRENCY, help='max in-flight LLM requests')
+    parser.add_argument('--html-backend', choices=sorted(HTML_BACKENDS), default=DEFAULT_HTML_BACKEND, help='paragraph extractor for the bbref pages')
+    parser.add_argument('--processes', type=int, default=1, help='parse independent years in this many processes')
+    parser.add_argument('--export-json', action='store_true', help='also write the range files and trades.json')
+    parser.add_argument('--rule-coverage', action='store_true', help='report how many clauses the rule parser resolves, without calling the model')
+    args = parser.parse_args()
+    if args.rule_coverage:
+        setup_logging('w')
+        coverage = rule_coverage()
+        print(f"Rule parser resolves {coverage['rules']}/{coverage['clauses']} clauses ({coverage['fraction']:.1%})")
+    else:
+        parse_trade_htmls(max_workers=args.concurrency, html_backend=args.html_backend, processes=args.processes,
+                          export_json=args.export_json)
+        write_report('trade_graph_builder')
\ No newline at end of file
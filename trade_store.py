@@ -0,0 +1,179 @@
+import os
+import json
+import tempfile
+import argparse
+from collections import defaultdict
+import pyarrow as pa
+import pyarrow.compute as pc
+
+TRADE_STORE_PATH = "trades.arrow"
+CHECKPOINT_DIR = "trade_checkpoints"
+
+_team = pa.dictionary(pa.int16(), pa.string())
+
+# one row per transferred asset; string columns are dictionary encoded
+TRADE_SCHEMA = pa.schema([
+    ("trade_id", pa.dictionary(pa.int32(), pa.string())),
+    ("season", pa.int16()),
+    ("trade_order", pa.int32()),
+    ("is_multi_team", pa.bool_()),
+    ("num_teams", pa.int8()),
+    ("from_team", _team),
+    ("to_team", _team),
+    ("asset_type", pa.dictionary(pa.int8(), pa.string())),
+    ("player", pa.dictionary(pa.int32(), pa.string())),
+    ("pick_year", pa.dictionary(pa.int8(), pa.string())),  # kept as text, bbref gives "" for future picks
+    ("pick_round", pa.int8()),
+    ("pick_team", _team),
+])
+
+
+def trade_transfers(trade: dict) -> list[tuple]:
+    """
+    (from_team, to_team, asset) for every asset in a Trade dict.
+    Each sent asset is paired with a team that acquired the same asset; anything
+    left unpaired keeps None on the missing side so no asset is dropped.
+    """
+    def key(asset):
+        return (asset["type"], asset.get("name"), str(asset.get("year")), asset.get("round"), asset.get("team"))
+
+    receivers = defaultdict(list)
+    for side in trade["teams"]:
+        for asset in side["acquired"]:
+            receivers[key(asset)].append([side["team"], asset])
+
+    transfers = []
+    for side in trade["teams"]:
+        for asset in side["sent"]:
+            candidates = receivers.get(key(asset), [])
+            match = next((c for c in candidates if c[0] != side["team"]), None)
+            if match is None:
+                transfers.append((side["team"], None, asset))
+                continue
+            candidates.remove(match)
+            transfers.append((side["team"], match[0], asset))
+    for candidates in receivers.values():
+        for to_team, asset in candidates:
+            transfers.append((None, to_team, asset))
+    return transfers
+
+
+def trades_to_table(trades_by_season: dict) -> tuple[pa.Table, dict]:
+    """Flatten {season: [Trade dict]} into TRADE_SCHEMA rows, grouped by season"""
+    columns = {field.name: [] for field in TRADE_SCHEMA}
+    season_rows = {}
+    for season in sorted(trades_by_season, key=int):
+        start = len(columns["season"])
+        for order, trade in enumerate(trades_by_season[season]):
+            for from_team, to_team, asset in trade_transfers(trade):
+                is_pick = asset["type"] == "pick"
+                columns["trade_id"].append(f"{season}-{order}")
+                columns["season"].append(int(season))
+                columns["trade_order"].append(order)
+                columns["is_multi_team"].append(trade["is_multi_team"])
+                columns["num_teams"].append(trade["num_teams"])
+                columns["from_team"].append(from_team)
+                columns["to_team"].append(to_team)
+                columns["asset_type"].append(asset["type"])
+                columns["player"].append(asset.get("name") if asset["type"] == "player" else None)
+                columns["pick_year"].append(asset.get("year") if is_pick else None)
+                columns["pick_round"].append(asset.get("round") if is_pick else None)
+                columns["pick_team"].append(asset.get("team") if is_pick else None)
+        season_rows[str(season)] = (start, len(columns["season"]) - start)
+    return pa.Table.from_pydict(columns, schema=TRADE_SCHEMA), season_rows
+
+
+def write_trade_store(trades_by_season: dict, path: str = TRADE_STORE_PATH):
+    """
+    Arrow IPC file with one record batch per season. The season -> batch map
+    lives in the schema metadata so readers can pull single seasons.
+    """
+    table, season_rows = trades_to_table(trades_by_season)
+    table = table.combine_chunks()
+    season_batches = {}
+    batches = []
+    for season, (start, length) in season_rows.items():
+        if length == 0:
+            continue
+        season_batches[season] = len(batches)
+        batches.extend(table.slice(start, length).to_batches())
+    schema = TRADE_SCHEMA.with_metadata({"season_batches": json.dumps(season_batches)})
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".arrow")
+    os.close(fd)
+    os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_trade_rows(path: str = TRADE_STORE_PATH, seasons=None, teams=None) -> pa.Table:
+    """
+    Memory-mapped read of the trade store. Only the record batches for the
+    requested seasons are touched; teams keeps rows where either side matches.
+    """
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        season_batches = json.loads(reader.schema.metadata[b"season_batches"])
+        if seasons is None:
+            batch_ids = range(reader.num_record_batches)
+        else:
+            batch_ids = [season_batches[str(s)] for s in seasons if str(s) in season_batches]
+        table = pa.Table.from_batches([reader.get_batch(i) for i in batch_ids], schema=reader.schema)
+    if teams is not None:
+        teams = pa.array(list(teams), pa.string())
+        table = table.filter(pc.or_kleene(
+            pc.is_in(table["from_team"].cast(pa.string()), teams),
+            pc.is_in(table["to_team"].cast(pa.string()), teams),
+        ))
+    return table
+
+
+def rows_to_trades(table: pa.Table) -> dict:
+    """Inverse of trades_to_table: {season: [Trade dict]} for the JSON exports"""
+    trades_by_season = {}
+    trades = {}
+    for row in table.to_pylist():
+        season = str(row["season"])
+        trade = trades.get(row["trade_id"])
+        if trade is None:
+            trade = {"is_multi_team": row["is_multi_team"], "num_teams": row["num_teams"], "teams": {}}
+            trades[row["trade_id"]] = trade
+            trades_by_season.setdefault(season, []).append(trade)
+        if row["asset_type"] == "player":
+            asset = {"type": "player", "name": row["player"]}
+        elif row["asset_type"] == "pick":
+            asset = {"type": "pick", "year": row["pick_year"], "round": row["pick_round"], "team": row["pick_team"]}
+        else:
+            asset = {"type": "cash"}
+        for team, direction in ((row["from_team"], "sent"), (row["to_team"], "acquired")):
+            if team is not None:
+                trade["teams"].setdefault(team, {"team": team, "sent": [], "acquired": []})[direction].append(asset)
+    for trade in trades.values():
+        trade["teams"] = [trade["teams"][team] for team in sorted(trade["teams"])]
+    return trades_by_season
+
+
+def load_checkpoints(checkpoint_dir: str = CHECKPOINT_DIR) -> dict:
+    trades_by_season = {}
+    for filename in sorted(os.listdir(checkpoint_dir)):
+        if filename.endswith(".json") and filename[:-5].isdigit():
+            with open(os.path.join(checkpoint_dir, filename)) as f:
+                trades_by_season[filename[:-5]] = json.load(f)
+    return trades_by_season
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the columnar trade store from the per-year checkpoints")
+    parser.add_argument("--output", default=TRADE_STORE_PATH)
+    args = parser.parse_args()
+    trades_by_season = load_checkpoints()
+    write_trade_store(trades_by_season, args.output)
+    print(f"Wrote {sum(map(len, trades_by_season.values()))} trades to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KB)")